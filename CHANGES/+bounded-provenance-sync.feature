@@ -0,0 +1,2 @@
+Provenance is now fetched in the background during sync, with the number of concurrent fetches
+bounded by the remote's `download_concurrency` for the whole sync.
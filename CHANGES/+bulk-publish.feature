@@ -0,0 +1,2 @@
+Publishing now renders the project pages in batches, hashes them in a thread pool and creates their
+artifacts, content artifacts and published artifacts in bulk.
@@ -0,0 +1,2 @@
+Added a `changes/` endpoint to the PyPI APIs listing the projects changed after a serial or a repository
+version of the index, so mirrors only have to sync the changed projects.
@@ -0,0 +1,2 @@
+Repeated syncs now make conditional requests (`If-None-Match`/`If-Modified-Since`) for the
+metadata of each project and skip the projects that weren't modified upstream.
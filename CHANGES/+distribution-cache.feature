@@ -0,0 +1 @@
+Added the `PYTHON_DISTRIBUTION_CACHE_TTL` setting to cache the distributions resolved by the PyPI APIs.
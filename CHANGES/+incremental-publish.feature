@@ -0,0 +1,2 @@
+Publishing a repository version now reuses the simple pages of the projects that didn't change since the
+previous publication of the repository, only the changed projects are rendered again.
@@ -0,0 +1,2 @@
+Syncs of remotes without "includes" are now incremental: the last synced PyPI serial is stored on
+the repository and later syncs only process the projects that changed upstream since then.
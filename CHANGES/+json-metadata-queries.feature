@@ -0,0 +1 @@
+Build the JSON metadata of the projects in one query, with the md5 digests of their packages.
@@ -0,0 +1,2 @@
+Added the `PYTHON_PUBLISH_WORKERS` setting to render the project pages of a publication in parallel
+with a pool of processes.
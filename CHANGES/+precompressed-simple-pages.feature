@@ -0,0 +1,2 @@
+Publications now store gzip (and brotli, when the `brotli` package is installed) compressed copies of
+the larger simple pages, which the content app serves to the clients accepting their encoding.
@@ -0,0 +1 @@
+Serve the JSON metadata of the latest release of the projects from the project index.
@@ -0,0 +1,2 @@
+The simple API of distributions serving a repository without a publication is now served from a project
+index, built incrementally for every new repository version, instead of querying the repository content.
@@ -0,0 +1,3 @@
+The PyPI APIs now expose serials that increase with every repository version, and per project serials
+of their last change, instead of a constant. An XML-RPC endpoint with `changelog_since_serial` and
+`list_packages_with_serial` lets Pulp and bandersnatch mirrors of the index sync incrementally.
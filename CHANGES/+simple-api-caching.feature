@@ -0,0 +1,3 @@
+The simple and JSON metadata pages of the PyPI APIs now have `ETag` and `Last-Modified` headers and
+answer conditional requests with a 304. Python distributions have a new `cache_max_age` field to set
+the `max-age` of their `Cache-Control` header.
@@ -0,0 +1,2 @@
+Remotes with `sync_api` set to `simple` now build the content of each project from its simple page and
+core metadata files, without requesting the PyPI JSON API for every project.
@@ -0,0 +1,2 @@
+Publications now include the PEP 691 JSON form of the simple pages, which is served by the content app
+to the clients that prefer it in their `Accept` header.
@@ -0,0 +1 @@
+Added the `PYTHON_SIMPLE_PAGE_CACHE` setting to share the project simple pages rendered by the PyPI APIs through a Django cache.
@@ -0,0 +1 @@
+Look up the provenance of the packages of a simple page in the same query as the packages.
@@ -0,0 +1,2 @@
+The simple API templates are now compiled once per process, and the simple detail pages are rendered
+without Jinja.
@@ -0,0 +1,2 @@
+Store the summary statistics of the PyPI index when repository versions are created.
+Run `pulpcore-manager summarize-python-repository-versions` to compute them for the existing repository versions.
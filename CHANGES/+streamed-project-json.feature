@@ -0,0 +1 @@
+Stream the JSON metadata of the projects, reading their releases one by one.
@@ -0,0 +1,2 @@
+When a remote doesn't support XML-RPC, sync now requests its simple index in the PEP 691 JSON form
+when available and parses it incrementally, keeping memory usage low for large indexes.
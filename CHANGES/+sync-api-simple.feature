@@ -0,0 +1,3 @@
+Added a `sync_api` field to Python remotes. Setting it to `simple` makes syncs list the projects
+from the PEP 691 JSON simple index instead of XML-RPC, and skip the projects whose `_last-serial`
+didn't change since the last sync.
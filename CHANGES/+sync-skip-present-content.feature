@@ -0,0 +1,2 @@
+Syncs no longer declare the package files that are already present in the repository, which
+reduces the work done by the sync pipeline on resyncs of large repositories.
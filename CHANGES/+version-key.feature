@@ -0,0 +1 @@
+Added a sortable key of the version of the Python packages, the JSON metadata of the projects is built without parsing their versions.
@@ -26,7 +26,14 @@ class PulpPythonPluginAppConfig(PulpPluginAppConfig):
 
 # TODO: Remove this when https://github.com/pulp/pulpcore/issues/5500 is resolved
 def _populate_pypi_access_policies(sender, apps, verbosity, **kwargs):
-    from pulp_python.app.pypi.views import PyPIView, SimpleView, UploadView, MetadataView
+    from pulp_python.app.pypi.views import (
+        ChangesView,
+        PyPIView,
+        SimpleView,
+        UploadView,
+        MetadataView,
+        XMLRPCView,
+    )
 
     try:
         AccessPolicy = apps.get_model("core", "AccessPolicy")
@@ -35,7 +42,7 @@ def _populate_pypi_access_policies(sender, apps, verbosity, **kwargs):
             print(_("AccessPolicy model does not exist. Skipping initialization."))
         return
 
-    for viewset in (PyPIView, SimpleView, UploadView, MetadataView):
+    for viewset in (PyPIView, SimpleView, UploadView, MetadataView, ChangesView, XMLRPCView):
         access_policy = getattr(viewset, "DEFAULT_ACCESS_POLICY", None)
         if access_policy is not None:
             viewset_name = viewset.urlpattern()
@@ -0,0 +1,23 @@
+from aiohttp import web
+
+from pulpcore.content import app
+
+from pulp_python.app.utils import content_request_headers
+
+
+@web.middleware
+async def request_headers(request, handler):
+    """
+    Make the headers of the request available to PythonDistribution.content_handler.
+
+    The content handler is only given the path, the headers are needed to negotiate the format
+    of the simple pages.
+    """
+    token = content_request_headers.set(request.headers)
+    try:
+        return await handler(request)
+    finally:
+        content_request_headers.reset(token)
+
+
+app.middlewares.append(request_headers)
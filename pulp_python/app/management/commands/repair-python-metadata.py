@@ -7,7 +7,8 @@ from django.conf import settings
 
 from pulpcore.plugin.util import extract_pk
 from pulp_python.app.models import PythonPackageContent, PythonRepository
-from pulp_python.app.utils import artifact_to_python_content_data
+from pulp_python.app.tasks.repair import reindex_repositories
+from pulp_python.app.utils import artifact_to_python_content_data, version_key
 
 
 def repair_metadata(content):
@@ -23,6 +24,7 @@ def repair_metadata(content):
     batch = []
     set_of_update_fields = set()
     total_repaired = 0
+    repaired_pks = set()
     for package in immediate_content.prefetch_related("_artifacts").iterator(chunk_size=1000):
         # Get the main artifact
         main_artifact = (
@@ -39,8 +41,14 @@ def repair_metadata(content):
                 setattr(package, field, value)
                 set_of_update_fields.add(field)
                 changed = True
+        # bulk_update() doesn't run the hooks of the model, keep the version key in sync here
+        if package.version_key != (key := version_key(package.version)):
+            package.version_key = key
+            set_of_update_fields.add("version_key")
+            changed = True
         if changed:
             batch.append(package)
+            repaired_pks.add(package.pk)
         if len(batch) == 1000:
             total_repaired += len(batch)
             PythonPackageContent.objects.bulk_update(batch, set_of_update_fields)
@@ -51,6 +59,8 @@ def repair_metadata(content):
         total_repaired += len(batch)
         PythonPackageContent.objects.bulk_update(batch, set_of_update_fields)
 
+    reindex_repositories(repaired_pks)
+
     return total_repaired
 
 
@@ -0,0 +1,46 @@
+from django.core.management import BaseCommand
+from gettext import gettext as _
+
+from pulpcore.plugin.models import RepositoryVersion
+from pulp_python.app.models import SUMMARY_KEY, PythonRepository, summarize_repository_version
+
+
+class Command(BaseCommand):
+    """
+    Management command to compute the summary statistics of the Python repository versions.
+    """
+
+    help = _(
+        "Compute the summary statistics served by the PyPI APIs for the Python repository "
+        "versions created before they were stored."
+    )
+
+    def add_arguments(self, parser):
+        """Set up arguments."""
+        parser.add_argument(
+            "--domain",
+            default=None,
+            required=False,
+            help=_("The pulp domain to gather the repository versions from if specified."),
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help=_("Compute the summary of the repository versions that already have one too."),
+        )
+
+    def handle(self, *args, **options):
+        """Implement the command."""
+        repositories = PythonRepository.objects.all()
+        if domain := options.get("domain"):
+            repositories = repositories.filter(pulp_domain__name=domain)
+        versions = RepositoryVersion.objects.complete().filter(repository__in=repositories)
+        if not options["all"]:
+            versions = versions.exclude(info__has_key=SUMMARY_KEY)
+
+        num_summarized = 0
+        for version in versions.iterator():
+            version.info[SUMMARY_KEY] = summarize_repository_version(version)
+            version.save(update_fields=["info"])
+            num_summarized += 1
+        print(f"{num_summarized} repository versions summarized.")
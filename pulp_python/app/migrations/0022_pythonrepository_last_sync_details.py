@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("python", "0021_pythonrepository_upload_duplicate_filenames"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pythonrepository",
+            name="last_sync_details",
+            field=models.JSONField(default=dict),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:57
+
+import django.db.models.deletion
+import django_lifecycle.mixins
+import pulpcore.app.models.base
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("python", "0022_pythonrepository_last_sync_details"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectSyncState",
+            fields=[
+                (
+                    "pulp_id",
+                    models.UUIDField(
+                        default=pulpcore.app.models.base.pulp_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("pulp_created", models.DateTimeField(auto_now_add=True)),
+                ("pulp_last_updated", models.DateTimeField(auto_now=True, null=True)),
+                ("name", models.TextField()),
+                ("etag", models.TextField(null=True)),
+                ("last_modified", models.TextField(null=True)),
+                ("serial", models.BigIntegerField(default=0)),
+                (
+                    "remote",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="python.pythonremote"
+                    ),
+                ),
+                (
+                    "repository",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="python.pythonrepository"
+                    ),
+                ),
+            ],
+            options={
+                "default_related_name": "%(app_label)s_%(model_name)s",
+                "unique_together": {("repository", "remote", "name")},
+            },
+            bases=(django_lifecycle.mixins.LifecycleModelMixin, models.Model),
+        ),
+    ]
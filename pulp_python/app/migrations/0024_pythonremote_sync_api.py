@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("python", "0023_projectsyncstate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pythonremote",
+            name="sync_api",
+            field=models.TextField(
+                choices=[("xmlrpc", "xmlrpc"), ("simple", "simple")], default="xmlrpc"
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:08
+
+import django.db.models.deletion
+import django_lifecycle.mixins
+import pulpcore.app.models.base
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("python", "0024_pythonremote_sync_api"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectIndexEntry",
+            fields=[
+                (
+                    "pulp_id",
+                    models.UUIDField(
+                        default=pulpcore.app.models.base.pulp_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("pulp_created", models.DateTimeField(auto_now_add=True)),
+                ("pulp_last_updated", models.DateTimeField(auto_now=True, null=True)),
+                ("name", models.TextField()),
+                ("name_normalized", models.TextField()),
+                ("version_added", models.PositiveIntegerField()),
+                ("version_removed", models.PositiveIntegerField(null=True)),
+                ("files", models.JSONField(default=list)),
+                (
+                    "repository",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="python.pythonrepository"
+                    ),
+                ),
+            ],
+            options={
+                "default_related_name": "%(app_label)s_%(model_name)s",
+                "unique_together": {("repository", "name_normalized", "version_added")},
+            },
+            bases=(django_lifecycle.mixins.LifecycleModelMixin, models.Model),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("python", "0025_projectindexentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pythondistribution",
+            name="cache_max_age",
+            field=models.PositiveIntegerField(default=None, null=True),
+        ),
+    ]
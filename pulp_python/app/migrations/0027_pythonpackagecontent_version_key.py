@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:31
+
+from django.db import migrations, models, transaction
+from packaging.version import InvalidVersion, parse
+
+PRE_RELEASE_KEYS = {"a": "a", "b": "b", "rc": "c"}
+
+
+def sortable_int(number):
+    """Encodes a non negative integer in a string sorting like the number."""
+    digits = str(number)
+    return f"{len(digits):02d}{digits}"
+
+
+def version_key(version):
+    """Returns a string that sorts like the PEP 440 version, compared byte by byte."""
+    try:
+        parsed = parse(version)
+    except (InvalidVersion, TypeError):
+        return ""
+
+    release = list(parsed.release)
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    key = [sortable_int(parsed.epoch), *map(sortable_int, release), "."]
+
+    if parsed.pre is None and parsed.post is None and parsed.dev is not None:
+        key.append("0")
+    elif parsed.pre is None:
+        key.append("2")
+    else:
+        letter, number = parsed.pre
+        key.append(f"1{PRE_RELEASE_KEYS[letter]}{sortable_int(number)}")
+    key.append("0" if parsed.post is None else f"1{sortable_int(parsed.post)}")
+    key.append("1" if parsed.dev is None else f"0{sortable_int(parsed.dev)}")
+    if parsed.local is None:
+        key.append("0")
+    else:
+        key.append("1")
+        for segment in parsed.local.split("."):
+            key.append(f"1{sortable_int(int(segment))}" if segment.isdigit() else f"0{segment}!")
+        key.append(".")
+    return "".join(key)
+
+
+def populate_version_key(apps, schema_editor):
+    """Populate version_key for existing PythonPackageContent rows."""
+    PythonPackageContent = apps.get_model("python", "PythonPackageContent")
+    package_bulk = []
+
+    for package in PythonPackageContent.objects.only("pk", "version").iterator():
+        package.version_key = version_key(package.version)
+        package_bulk.append(package)
+        if len(package_bulk) == 100000:
+            with transaction.atomic():
+                PythonPackageContent.objects.bulk_update(package_bulk, ["version_key"])
+                package_bulk = []
+    if package_bulk:
+        with transaction.atomic():
+            PythonPackageContent.objects.bulk_update(package_bulk, ["version_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("python", "0026_pythondistribution_cache_max_age"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pythonpackagecontent",
+            name="version_key",
+            field=models.TextField(db_collation="C", default=""),
+        ),
+        migrations.RunPython(populate_version_key, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("python", "0027_pythonpackagecontent_version_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projectindexentry",
+            name="file_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="projectindexentry",
+            name="info",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="projectindexentry",
+            name="latest_version",
+            field=models.TextField(null=True),
+        ),
+    ]
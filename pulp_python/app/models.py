@@ -1,11 +1,15 @@
 import hashlib
 import json
+from collections import defaultdict
+from functools import partial
 from logging import getLogger
 
-from aiohttp.web import json_response
+from aiohttp.web import HTTPNotAcceptable
 from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Value
+from django.db.models.functions import Concat
 from django.conf import settings
 from django_lifecycle import (
     BEFORE_SAVE,
@@ -14,23 +18,38 @@ from django_lifecycle import (
 from rest_framework.serializers import ValidationError
 from pulpcore.plugin.models import (
     AutoAddObjPermsMixin,
+    BaseModel,
     Content,
     Publication,
     Distribution,
     Remote,
     Repository,
+    RepositoryVersion,
 )
 from pulpcore.plugin.responses import ArtifactResponse
 
 from pathlib import PurePath
 from .provenance import Provenance
 from .utils import (
+    annotate_md5,
     artifact_to_python_content_data,
     artifact_to_metadata_artifact,
     canonicalize_name,
+    content_request_headers,
+    project_index_entry_to_json,
+    python_content_to_info,
     python_content_to_json,
+    python_content_to_json_stream,
+    select_content_encoding,
+    select_simple_media_type,
+    COMPRESSED_FILE_EXTENSIONS,
+    StreamingJSONResponse,
+    UncachedArtifactResponse,
+    version_key,
+    version_serial,
     PYPI_LAST_SERIAL,
-    PYPI_SERIAL_CONSTANT,
+    PYPI_SIMPLE_V1_JSON,
+    SIMPLE_HTML_MEDIA_TYPES,
 )
 from pulpcore.plugin.repo_version_utils import (
     collect_duplicates,
@@ -41,6 +60,12 @@ from pulpcore.plugin.util import get_domain_pk, get_domain
 
 log = getLogger(__name__)
 
+# Key set in the info of the repository versions whose projects are in the project index
+PROJECT_INDEX_KEY = "python_project_index"
+# Key of the summary statistics of the PyPI index in the info of the repository versions
+SUMMARY_KEY = "python_summary"
+# The request headers the simple pages served by the content app are negotiated with
+SIMPLE_PAGE_VARY = "Accept, Accept-Encoding"
 
 PACKAGE_TYPES = (
     ("bdist_dmg", "bdist_dmg"),
@@ -60,6 +85,11 @@ PLATFORMS = (
     ("linux", "linux"),
 )
 
+SYNC_APIS = (
+    ("xmlrpc", "xmlrpc"),
+    ("simple", "simple"),
+)
+
 
 class PythonDistribution(Distribution, AutoAddObjPermsMixin):
     """
@@ -69,6 +99,7 @@ class PythonDistribution(Distribution, AutoAddObjPermsMixin):
     TYPE = "python"
 
     allow_uploads = models.BooleanField(default=True)
+    cache_max_age = models.PositiveIntegerField(null=True, default=None)
 
     def content_handler(self, path):
         """
@@ -89,51 +120,105 @@ class PythonDistribution(Distribution, AutoAddObjPermsMixin):
             name = path.parts[1]
         elif path.match("pypi/*/json"):
             name = path.parts[1]
-        elif len(path.parts) and path.parts[0] == "simple":
-            # Temporary fix for PublishedMetadata not being properly served from remote storage
-            # https://github.com/pulp/pulp_python/issues/413
-            if domain.storage_class != "pulpcore.app.models.storage.FileSystem":
-                if self.publication or self.repository:
-                    try:
-                        publication = self.publication or Publication.objects.filter(
-                            repository_version=self.repository.latest_version()
-                        ).latest("pulp_created")
-                    except ObjectDoesNotExist:
-                        return None
-                    if len(path.parts) == 2:
-                        path = PurePath(f"simple/{canonicalize_name(path.parts[1])}")
-                    rel_path = f"{path}/index.html"
-                    try:
-                        ca = (
-                            publication.published_artifact.select_related(
-                                "content_artifact",
-                                "content_artifact__artifact",
-                            )
-                            .get(relative_path=rel_path)
-                            .content_artifact
-                        )
-                    except ObjectDoesNotExist:
-                        return None
-                    headers = {"Content-Type": "text/html"}
-                    return ArtifactResponse(ca.artifact, headers=headers)
+        elif len(path.parts) and path.parts[0] == "simple" and len(path.parts) <= 2:
+            request_headers = content_request_headers.get() or {}
+            accept = request_headers.get("Accept")
+            media_type = select_simple_media_type(accept)
+            encoding = select_content_encoding(request_headers.get("Accept-Encoding"))
+            if (
+                media_type != PYPI_SIMPLE_V1_JSON
+                and not encoding
+                and not settings.CACHE_ENABLED
+                and domain.storage_class == "pulpcore.app.models.storage.FileSystem"
+            ):
+                # The plain HTML page is served like any other published file
+                return None
+            if self.publication or self.repository:
+                try:
+                    publication = self.publication or Publication.objects.filter(
+                        repository_version=self.repository.latest_version()
+                    ).latest("pulp_created")
+                except ObjectDoesNotExist:
+                    return None
+                if len(path.parts) == 2:
+                    path = PurePath(f"simple/{canonicalize_name(path.parts[1])}")
+                return self._serve_simple_page(publication, path, accept, media_type, encoding)
 
         if name:
             normalized = canonicalize_name(name)
-            package_content = PythonPackageContent.objects.filter(
-                pk__in=self.publication.repository_version.content, name_normalized=normalized
-            )
-            # TODO Change this value to the Repo's serial value when implemented
-            headers = {PYPI_LAST_SERIAL: str(PYPI_SERIAL_CONSTANT)}
+            repository_version = self.publication.repository_version
+            serial = get_project_serials(repository_version, [normalized])
+            headers = {PYPI_LAST_SERIAL: str(serial[normalized])}
             if not settings.DOMAIN_ENABLED:
                 domain = None
-            json_body = python_content_to_json(
-                self.base_path, package_content, version=version, domain=domain
+            json_body = get_project_json(
+                repository_version,
+                self.base_path,
+                normalized,
+                release=version,
+                domain=domain,
+                last_serial=serial[normalized],
+                streamed=True,
             )
-            if json_body:
-                return json_response(json_body, headers=headers)
+            if json_body is not None:
+                return StreamingJSONResponse(json_body, headers=headers)
 
         return None
 
+    @staticmethod
+    def _serve_simple_page(publication, path, accept, media_type, encoding):
+        """
+        Serve the variant of a published simple page negotiated with the request headers.
+
+        Publications created before the JSON and precompressed pages only have the HTML pages,
+        which are served to the clients accepting them, the others get a 406 response.
+        """
+        pages = {"text/html": f"{path}/index.html", PYPI_SIMPLE_V1_JSON: f"{path}/index.json"}
+        rel_paths = [
+            f"{page}{extension}"
+            for page in pages.values()
+            for extension in ("", *COMPRESSED_FILE_EXTENSIONS.values())
+        ]
+        content_artifacts = {
+            pa.relative_path: pa.content_artifact
+            for pa in publication.published_artifact.select_related(
+                "content_artifact",
+                "content_artifact__artifact",
+            ).filter(relative_path__in=rel_paths)
+        }
+        headers = {"Vary": SIMPLE_PAGE_VARY}
+        if media_type != PYPI_SIMPLE_V1_JSON:
+            media_type = "text/html"
+        elif pages[PYPI_SIMPLE_V1_JSON] not in content_artifacts:
+            if not select_simple_media_type(accept, SIMPLE_HTML_MEDIA_TYPES):
+                raise HTTPNotAcceptable(headers=headers)
+            media_type = "text/html"
+        page = pages[media_type]
+        if page not in content_artifacts:
+            return None
+        headers["Content-Type"] = media_type
+        ca = content_artifacts[page]
+        # Small pages have no precompressed copy
+        if encoding and (
+            compressed := content_artifacts.get(page + COMPRESSED_FILE_EXTENSIONS[encoding])
+        ):
+            ca = compressed
+            headers["Content-Encoding"] = encoding
+        # The content cache keys its entries on the path of the requests only, the page can only
+        # be cached when it has no other variant to serve to the next clients
+        if settings.CACHE_ENABLED and len(content_artifacts) > 1:
+            return UncachedArtifactResponse(ca.artifact, headers=headers)
+        return ArtifactResponse(ca.artifact, headers=headers)
+
+    def content_headers_for(self, path):
+        """Vary the simple pages on the request headers they are negotiated with."""
+        parts = PurePath(path).parts
+        if parts[-1:] == ("index.html",):
+            parts = parts[:-1]
+        if parts[:1] == ("simple",) and len(parts) <= 2:
+            return {"Vary": SIMPLE_PAGE_VARY}
+        return {}
+
     class Meta:
         default_related_name = "%(app_label)s_%(model_name)s"
         permissions = [
@@ -194,6 +279,8 @@ class PythonPackageContent(Content):
 
     # Stored normalized name for indexed lookups
     name_normalized = models.TextField(db_index=True, default="")
+    # Stored PEP 440 ordering of the version, compared byte by byte
+    version_key = models.TextField(db_collation="C", default="")
 
     # Release metadata
     filename = models.TextField(db_index=True)
@@ -215,6 +302,11 @@ class PythonPackageContent(Content):
         """Pre-compute the normalized package name for indexed lookups."""
         self.name_normalized = canonicalize_name(self.name)
 
+    @hook(BEFORE_SAVE)
+    def set_version_key(self):
+        """Pre-compute the sortable key of the version for ordering in the database."""
+        self.version_key = version_key(self.version)
+
     @staticmethod
     def init_from_artifact_and_relative_path(artifact, relative_path):
         """Used when downloading package from pull-through cache."""
@@ -308,6 +400,7 @@ class PythonRemote(Remote, AutoAddObjPermsMixin):
     Fields:
 
         prereleases (models.BooleanField): Whether to sync pre-release versions of packages.
+        sync_api (models.TextField): The API used to list the projects of the remote.
     """
 
     TYPE = "python"
@@ -323,6 +416,7 @@ class PythonRemote(Remote, AutoAddObjPermsMixin):
         models.CharField(max_length=10, blank=True), choices=PLATFORMS, default=list
     )
     provenance = models.BooleanField(default=False)
+    sync_api = models.TextField(choices=SYNC_APIS, default="xmlrpc")
 
     def get_remote_artifact_url(self, relative_path=None, request=None):
         """Get url for remote_artifact"""
@@ -368,6 +462,7 @@ class PythonRepository(Repository, AutoAddObjPermsMixin):
 
     autopublish = models.BooleanField(default=False)
     allow_package_substitution = models.BooleanField(default=True)
+    last_sync_details = models.JSONField(default=dict)
 
     class Meta:
         default_related_name = "%(app_label)s_%(model_name)s"
@@ -399,11 +494,174 @@ class PythonRepository(Repository, AutoAddObjPermsMixin):
 
         When allow_package_substitution is False, reject any new version that would implicitly
         replace existing content with different checksums (content substitution).
+
+        The project index and the summary are updated for the new version once its content is
+        final, unless the version has no changes and is about to be deleted.
         """
         if not self.allow_package_substitution:
             self._check_for_package_substitution(new_version)
         remove_duplicates(new_version)
         validate_repo_version(new_version)
+        if not new_version.added().exists() and not new_version.removed().exists():
+            return
+        self.update_project_index(new_version)
+        new_version.info[SUMMARY_KEY] = summarize_repository_version(new_version)
+
+    def update_project_index(self, new_version):
+        """
+        Update the project index for a new repository version.
+
+        When the version the new one is based on is indexed, only the projects changed by the new
+        version are indexed again. Otherwise the whole index is built from scratch. The entries
+        are changed in a transaction, the simple API reads the index of the versions it serves.
+        """
+        entries = ProjectIndexEntry.objects.filter(repository=self)
+        try:
+            base_version = new_version.previous()
+        except RepositoryVersion.DoesNotExist:
+            base_version = None
+
+        with transaction.atomic():
+            if base_version and base_version.info.get(PROJECT_INDEX_KEY):
+                # Undo what was indexed for versions after the base version that were deleted
+                entries.filter(version_added__gt=base_version.number).delete()
+                entries.filter(version_removed__gt=base_version.number).update(version_removed=None)
+                changed = Q(pk__in=new_version.added()) | Q(pk__in=new_version.removed())
+                names = set(
+                    PythonPackageContent.objects.filter(changed).values_list(
+                        "name_normalized", flat=True
+                    )
+                )
+                names.update(
+                    PackageProvenance.objects.filter(changed).values_list(
+                        "package__name_normalized", flat=True
+                    )
+                )
+                names = sorted(names)
+                for i in range(0, len(names), 1000):
+                    batch = names[i : i + 1000]
+                    entries.filter(name_normalized__in=batch, version_removed__isnull=True).update(
+                        version_removed=new_version.number
+                    )
+                    self._index_projects(new_version, batch)
+                self._delete_unused_project_index_entries()
+            else:
+                self._rebuild_project_index(new_version)
+        new_version.info[PROJECT_INDEX_KEY] = True
+
+    def reindex_projects(self):
+        """
+        Build the project index of the latest version again, from scratch.
+
+        Used after the content of the repository was changed in place, like by a repair, which
+        leaves the files and info of the indexed projects stale. The older versions are served
+        from their content afterwards.
+        """
+        version = self.latest_version()
+        with transaction.atomic():
+            self._rebuild_project_index(version)
+            version.info[PROJECT_INDEX_KEY] = True
+            version.info[SUMMARY_KEY] = summarize_repository_version(version)
+            version.save(update_fields=["info"])
+
+    def _rebuild_project_index(self, version):
+        """Replace the whole project index by the index of a repository version."""
+        ProjectIndexEntry.objects.filter(repository=self).delete()
+        for indexed_version in self.versions.filter(info__has_key=PROJECT_INDEX_KEY):
+            del indexed_version.info[PROJECT_INDEX_KEY]
+            indexed_version.save(update_fields=["info"])
+        self._index_projects(version)
+
+    def _index_projects(self, version, names=None):
+        """Create the project index entries of a repository version, for all or some projects."""
+        content = PythonPackageContent.objects.filter(pk__in=version.content)
+        if names is not None:
+            content = content.filter(name_normalized__in=names)
+        provenances = PackageProvenance.objects.filter(
+            pk__in=version.content, package=OuterRef("pk")
+        )
+        packages = (
+            annotate_md5(content.annotate(provenance=Exists(provenances)))
+            .order_by("name_normalized", "filename")
+            .values(
+                "name",
+                "name_normalized",
+                "filename",
+                "sha256",
+                "md5",
+                "metadata_sha256",
+                "requires_python",
+                "size",
+                "pulp_created",
+                "version",
+                "version_key",
+                "packagetype",
+                "python_version",
+                "provenance",
+            )
+        )
+
+        batch = []
+        entry = None
+        for package in packages.iterator(chunk_size=2000):
+            if entry is None or entry.name_normalized != package["name_normalized"]:
+                if len(batch) >= 1000:
+                    self._create_project_index_entries(content, batch)
+                    batch = []
+                entry = ProjectIndexEntry(
+                    repository=self,
+                    name=package["name"],
+                    name_normalized=package["name_normalized"],
+                    version_added=version.number,
+                    files=[],
+                )
+                batch.append(entry)
+            entry.files.append(
+                {
+                    "filename": package["filename"],
+                    "sha256": package["sha256"],
+                    "md5": package["md5"],
+                    "metadata_sha256": package["metadata_sha256"],
+                    "requires_python": package["requires_python"],
+                    "size": package["size"],
+                    "upload_time": package["pulp_created"].isoformat(),
+                    "version": package["version"],
+                    "packagetype": package["packagetype"],
+                    "python_version": package["python_version"],
+                    "provenance": package["provenance"],
+                }
+            )
+        self._create_project_index_entries(content, batch)
+
+    @staticmethod
+    def _create_project_index_entries(content, entries):
+        """
+        Create project index entries with the summary of their latest release.
+
+        The latest release of each project is read from its content with the highest version key.
+        """
+        latest_releases = (
+            content.filter(name_normalized__in=[entry.name_normalized for entry in entries])
+            .order_by("name_normalized", "-version_key", "filename")
+            .distinct("name_normalized")
+        )
+        latest_releases = {release.name_normalized: release for release in latest_releases}
+        for entry in entries:
+            if release := latest_releases.get(entry.name_normalized):
+                entry.latest_version = release.version
+                entry.info = python_content_to_info(release)
+            entry.file_count = len(entry.files)
+        ProjectIndexEntry.objects.bulk_create(entries)
+
+    def _delete_unused_project_index_entries(self):
+        """Delete the project index entries not part of any remaining repository version."""
+        versions = self.versions.complete().filter(
+            Q(number__gte=OuterRef("version_added")),
+            Q(number__lt=OuterRef("version_removed")),
+        )
+        ProjectIndexEntry.objects.filter(repository=self, version_removed__isnull=False).exclude(
+            Exists(versions)
+        ).delete()
 
     def _check_for_package_substitution(self, new_version):
         """
@@ -418,3 +676,173 @@ class PythonRepository(Repository, AutoAddObjPermsMixin):
                 "To allow this, set 'allow_package_substitution' to True on the repository. "
                 f"Conflicting packages: {duplicates}"
             )
+
+
+class ProjectSyncState(BaseModel):
+    """
+    The state of a remote's project as seen by the last sync of a repository.
+
+    Holds the HTTP validators of the project's metadata, used to make conditional requests on the
+    next sync, and the last serial of the project.
+
+    Fields:
+
+        name (models.TextField): The normalized name of the project.
+        etag (models.TextField): The ETag of the project's metadata.
+        last_modified (models.TextField): The Last-Modified date of the project's metadata.
+        serial (models.BigIntegerField): The last serial of the project.
+
+    Relations:
+
+        repository (models.ForeignKey): The repository that was synced.
+        remote (models.ForeignKey): The remote the repository was synced from.
+    """
+
+    repository = models.ForeignKey(PythonRepository, on_delete=models.CASCADE)
+    remote = models.ForeignKey(PythonRemote, on_delete=models.CASCADE)
+    name = models.TextField()
+    etag = models.TextField(null=True)
+    last_modified = models.TextField(null=True)
+    serial = models.BigIntegerField(default=0)
+
+    class Meta:
+        default_related_name = "%(app_label)s_%(model_name)s"
+        unique_together = ("repository", "remote", "name")
+
+
+class ProjectIndexQuerySet(models.QuerySet):
+    """QuerySet of ProjectIndexEntry."""
+
+    def for_version(self, version):
+        """Filter the entries of the projects in a repository version."""
+        return self.filter(
+            Q(version_removed__isnull=True) | Q(version_removed__gt=version.number),
+            repository_id=version.repository_id,
+            version_added__lte=version.number,
+        )
+
+    def changed_between(self, base_version, version):
+        """Filter the entries of the projects that changed after base_version up to version."""
+        added = Q(version_added__gt=base_version.number, version_added__lte=version.number)
+        removed = Q(version_removed__gt=base_version.number, version_removed__lte=version.number)
+        return self.filter(added | removed, repository_id=version.repository_id)
+
+
+class ProjectIndexEntry(BaseModel):
+    """
+    A project in the simple index of the versions of a repository.
+
+    The entries are valid for a range of repository versions, like the content of the
+    repository, and hold what is needed to serve the simple page of the project without
+    querying its content.
+
+    Fields:
+
+        name (models.TextField): The name of the project.
+        name_normalized (models.TextField): The normalized name of the project.
+        version_added (models.PositiveIntegerField): The first repository version number of the
+            entry.
+        version_removed (models.PositiveIntegerField): The repository version number the entry
+            was replaced or removed in, null if it's part of the latest version.
+        files (models.JSONField): The release files of the project.
+        file_count (models.PositiveIntegerField): The number of release files of the project.
+        latest_version (models.TextField): The latest version of the project, null for the
+            entries indexed before it was recorded.
+        info (models.JSONField): The info of the latest version in the PyPI JSON format.
+
+    Relations:
+
+        repository (models.ForeignKey): The indexed repository.
+    """
+
+    repository = models.ForeignKey(PythonRepository, on_delete=models.CASCADE)
+    name = models.TextField()
+    name_normalized = models.TextField()
+    version_added = models.PositiveIntegerField()
+    version_removed = models.PositiveIntegerField(null=True)
+    files = models.JSONField(default=list)
+    file_count = models.PositiveIntegerField(default=0)
+    latest_version = models.TextField(null=True)
+    info = models.JSONField(default=dict)
+
+    objects = ProjectIndexQuerySet.as_manager()
+
+    class Meta:
+        default_related_name = "%(app_label)s_%(model_name)s"
+        unique_together = ("repository", "name_normalized", "version_added")
+
+
+def get_project_serials(version, names=None):
+    """
+    Returns the serials of the last change of the projects in a repository version.
+
+    The projects of a version that isn't in the project index get the serial of the version.
+
+    Args:
+        version (pulpcore.plugin.models.RepositoryVersion): The repository version
+        names (list): The normalized names of the projects, all of them by default
+
+    Returns:
+        defaultdict: The normalized names of the projects mapped to their serial.
+    """
+    serials = defaultdict(partial(version_serial, version.number))
+    if version.info.get(PROJECT_INDEX_KEY):
+        entries = ProjectIndexEntry.objects.for_version(version)
+        if names is not None:
+            entries = entries.filter(name_normalized__in=names)
+        serials.update(
+            (name, version_serial(version_added))
+            for name, version_added in entries.values_list(
+                "name_normalized", "version_added"
+            ).iterator()
+        )
+    return serials
+
+
+def summarize_repository_version(version):
+    """
+    Returns the summary statistics of the PyPI index of a repository version.
+
+    Returns:
+        dict: The number of projects, releases and files of the repository version.
+    """
+    return PythonPackageContent.objects.filter(pk__in=version.content).aggregate(
+        projects=Count("name", distinct=True),
+        releases=Count(
+            Concat("name", Value(" "), "version", output_field=models.TextField()), distinct=True
+        ),
+        files=Count("pk"),
+    )
+
+
+def get_project_json(
+    version, base_path, name, release=None, domain=None, last_serial=0, streamed=False
+):
+    """
+    Returns the PyPI JSON metadata of a project in a repository version.
+
+    The metadata of the latest release is read from the project index when the version is
+    indexed, otherwise it is built from the content of the project.
+
+    Args:
+        version (pulpcore.plugin.models.RepositoryVersion): The repository version
+        base_path (str): The base path of the distribution serving the project
+        name (str): The normalized name of the project
+        release (str): The version of the project, the latest one by default
+        domain (pulpcore.plugin.models.Domain): The domain of the distribution, if enabled
+        last_serial (int): The serial of the project
+        streamed (bool): Whether to return the serialized JSON by chunks, with the releases
+            read one by one
+
+    Returns:
+        The JSON metadata, None if the project or its release doesn't exist.
+    """
+    if release is None and version.info.get(PROJECT_INDEX_KEY):
+        entry = ProjectIndexEntry.objects.for_version(version).filter(name_normalized=name).first()
+        if entry is None:
+            return None
+        if entry.latest_version is not None:
+            return project_index_entry_to_json(base_path, entry, domain, last_serial, streamed)
+    content = PythonPackageContent.objects.filter(pk__in=version.content, name_normalized=name)
+    to_json = python_content_to_json_stream if streamed else python_content_to_json
+    return to_json(base_path, content, version=release, domain=domain, last_serial=last_serial)
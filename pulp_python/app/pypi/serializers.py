@@ -24,6 +24,56 @@ class SummarySerializer(serializers.Serializer):
     files = serializers.IntegerField(help_text=_("Number of files for all distributions in index"))
 
 
+class ChangesQuerySerializer(serializers.Serializer):
+    """
+    A Serializer for the query of the projects changed in an index.
+    """
+
+    since = serializers.IntegerField(
+        help_text=_("Serial of the index the changes are requested after."),
+        required=False,
+        min_value=0,
+    )
+    since_version = serializers.IntegerField(
+        help_text=_("Repository version number the changes are requested after."),
+        required=False,
+        min_value=0,
+    )
+
+    def validate(self, data):
+        """Validates that the changes are requested after either a serial or a version."""
+        data = super().validate(data)
+        if ("since" in data) == ("since_version" in data):
+            raise serializers.ValidationError(
+                _("Exactly one of 'since' and 'since_version' must be specified.")
+            )
+        return data
+
+
+class ChangedProjectSerializer(serializers.Serializer):
+    """
+    A Serializer for a project changed in an index.
+    """
+
+    name = serializers.CharField(help_text=_("Name of the project"))
+    last_serial = serializers.IntegerField(help_text=_("Serial of the last change of the project"))
+    removed = serializers.BooleanField(help_text=_("Whether the project was removed"))
+
+
+class ChangedProjectsSerializer(serializers.Serializer):
+    """
+    A Serializer for the projects changed in an index.
+    """
+
+    last_serial = serializers.IntegerField(help_text=_("Serial of the index"))
+    full_list = serializers.BooleanField(
+        help_text=_(
+            "Whether the changes are unknown and all of the projects of the index are listed"
+        )
+    )
+    projects = ChangedProjectSerializer(many=True)
+
+
 class PackageMetadataSerializer(serializers.Serializer):
     """
     A Serializer for a package's metadata.
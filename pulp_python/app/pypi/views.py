@@ -1,16 +1,28 @@
+import hashlib
 import logging
+import xmlrpc.client
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from types import MappingProxyType
 
 from rest_framework.viewsets import ViewSet
 from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer, TemplateHTMLRenderer
 from rest_framework.response import Response
 from rest_framework.exceptions import NotAcceptable
+from django.core.cache import caches
 from django.core.exceptions import ObjectDoesNotExist
 from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date, quote_etag
 from datetime import datetime, timezone, timedelta
 
 from django.contrib.sessions.models import Session
 from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_delete, post_save
 from django.db.utils import DatabaseError
+from django.dispatch import receiver
 from django.http.response import (
     Http404,
     HttpResponseNotFound,
@@ -22,20 +34,32 @@ from django.http.response import (
 from drf_spectacular.utils import extend_schema
 from dynaconf import settings
 from itertools import chain
+from operator import itemgetter
 from packaging.utils import canonicalize_name
 from urllib.parse import urljoin, urlparse, urlunsplit
 from pathlib import PurePath
+from xml.parsers.expat import ExpatError
 
+from pulpcore.plugin.models import RepositoryVersion
 from pulpcore.plugin.viewsets import OperationPostponedResponse
 from pulpcore.plugin.tasking import dispatch
 from pulpcore.plugin.util import get_domain, get_url
 from pulp_python.app.models import (
+    PROJECT_INDEX_KEY,
+    SUMMARY_KEY,
+    ProjectIndexEntry,
     PythonDistribution,
     PythonPackageContent,
     PythonPublication,
+    PythonRepository,
     PackageProvenance,
+    get_project_json,
+    get_project_serials,
+    summarize_repository_version,
 )
 from pulp_python.app.pypi.serializers import (
+    ChangedProjectsSerializer,
+    ChangesQuerySerializer,
     SummarySerializer,
     PackageMetadataSerializer,
     PackageUploadSerializer,
@@ -46,10 +70,10 @@ from pulp_python.app.utils import (
     write_simple_index_json,
     write_simple_detail,
     write_simple_detail_json,
-    python_content_to_json,
     PYPI_LAST_SERIAL,
     PYPI_SERIAL_CONSTANT,
     get_remote_package_filter,
+    version_serial,
     get_remote_simple_page,
 )
 
@@ -60,6 +84,8 @@ log = logging.getLogger(__name__)
 ORIGIN_HOST = settings.CONTENT_ORIGIN if settings.CONTENT_ORIGIN else settings.PYPI_API_HOSTNAME
 BASE_CONTENT_URL = urljoin(ORIGIN_HOST, settings.CONTENT_PATH_PREFIX)
 BASE_API_URL = urljoin(settings.PYPI_API_HOSTNAME, settings.PYPI_PATH_PREFIX)
+MAX_XMLRPC_REQUEST_SIZE = 64 * 1024
+DISTRIBUTION_CACHE_SIZE = 1024
 
 PYPI_SIMPLE_V1_HTML = "application/vnd.pypi.simple.v1+html"
 PYPI_SIMPLE_V1_JSON = "application/vnd.pypi.simple.v1+json"
@@ -73,20 +99,120 @@ class PyPISimpleJSONRenderer(JSONRenderer):
     media_type = PYPI_SIMPLE_V1_JSON
 
 
+class DistributionCache:
+    """
+    An in-process LRU cache of the distributions resolved by the PyPI APIs.
+
+    Entries expire after PYTHON_DISTRIBUTION_CACHE_TTL seconds. The cache is cleared when a
+    distribution, repository, repository version or publication is saved in this process, the
+    changes made by other processes are seen once the entries expire. The cached values are
+    read-only mappings, shared by the requests of all the threads.
+    """
+
+    def __init__(self, maxsize=DISTRIBUTION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        """Returns the cached value of the key, or None if it is missing or expired."""
+        with self.lock:
+            try:
+                expires, value = self.entries[key]
+            except KeyError:
+                return None
+            if expires < monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Caches a read-only copy of the value of the key, evicting the least recently used entries.
+
+        Replacing the value of a cached key keeps its expiration time, the new value is derived
+        from the old one.
+        """
+        with self.lock:
+            if key in self.entries:
+                expires = self.entries[key][0]
+            else:
+                expires = monotonic() + settings.PYTHON_DISTRIBUTION_CACHE_TTL
+            self.entries[key] = (expires, MappingProxyType(dict(value)))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """Drops all of the cached entries."""
+        with self.lock:
+            self.entries.clear()
+
+
+distribution_cache = DistributionCache()
+
+
+@receiver([post_save, post_delete], sender=PythonDistribution)
+@receiver([post_save, post_delete], sender=PythonRepository)
+@receiver([post_save, post_delete], sender=PythonPublication)
+@receiver([post_save, post_delete], sender=RepositoryVersion)
+def clear_distribution_cache(sender, **kwargs):
+    """Clears the cached distributions when what they serve changes."""
+    distribution_cache.clear()
+
+
 class PyPIMixin:
     """Mixin to get index specific info."""
 
-    _distro = None
+    _resolved = None
+    _cache_key = None
+
+    def resolve(self):
+        """
+        Returns what is known of the distribution of the request.
+
+        The distribution, the repository version it serves and whether that repository version
+        has a publication are resolved once per request. When PYTHON_DISTRIBUTION_CACHE_TTL is set
+        they are shared with the following read requests of the index until they expire.
+        """
+        if self._resolved is not None:
+            return self._resolved
+
+        path = self.kwargs["path"]
+        cacheable = settings.PYTHON_DISTRIBUTION_CACHE_TTL and self.request.method in (
+            "GET",
+            "HEAD",
+        )
+        if cacheable:
+            self._cache_key = (get_domain().pk, path)
+        resolved = distribution_cache.get(self._cache_key) if cacheable else None
+        if resolved is None:
+            resolved = {"distribution": self.get_distribution(path)}
+            if cacheable:
+                distribution_cache.set(self._cache_key, resolved)
+        # The cached values are read-only, the request adds what it resolves to its own copy
+        self._resolved = dict(resolved)
+        return self._resolved
+
+    def resolve_once(self, key, get_value):
+        """Returns a value resolved for the distribution, shared like the distribution."""
+        resolved = self.resolve()
+        if key not in resolved:
+            resolved[key] = get_value()
+            if self._cache_key is not None:
+                distribution_cache.set(self._cache_key, resolved)
+        return resolved[key]
 
     @property
     def distribution(self):
-        if self._distro:
-            return self._distro
+        return self.resolve()["distribution"]
 
-        path = self.kwargs["path"]
-        distro = self.get_distribution(path)
-        self._distro = distro
-        return distro
+    def get_served_version(self):
+        """Returns the repository version the distribution of the request is serving."""
+        return self.resolve_once(
+            "repository_version", lambda: self.get_repository_version(self.distribution)
+        )
 
     @staticmethod
     def get_distribution(path):
@@ -124,19 +250,173 @@ class PyPIMixin:
         """Returns queryset of the provenance for this repository version."""
         return PackageProvenance.objects.filter(pk__in=repository_version.content)
 
+    @staticmethod
+    def get_project_index(repository_version):
+        """Returns queryset of the project index of this repository version, None if missing."""
+        if repository_version and repository_version.info.get(PROJECT_INDEX_KEY):
+            return ProjectIndexEntry.objects.for_version(repository_version)
+        return None
+
+    @classmethod
+    def get_project_packages(cls, repository_version, normalized):
+        """
+        Returns the packages of a project in a repository version, in one query.
+
+        Each package tells whether it has a provenance in the repository version.
+        """
+        if (project_index := cls.get_project_index(repository_version)) is not None:
+            entry = project_index.filter(name_normalized=normalized).first()
+            return [
+                {**p, "upload_time": datetime.fromisoformat(p["upload_time"])}
+                for p in (entry.files if entry else [])
+            ]
+
+        provenances = cls.get_provenances(repository_version).filter(package=OuterRef("pk"))
+        packages = (
+            cls.get_content(repository_version)
+            .filter(name_normalized=normalized)
+            .annotate(provenance=Exists(provenances))
+            .values(
+                "filename",
+                "sha256",
+                "metadata_sha256",
+                "requires_python",
+                "size",
+                "pulp_created",
+                "version",
+                "provenance",
+            )
+        )
+        return [{**p, "upload_time": p["pulp_created"]} for p in packages]
+
+    def get_cache_headers(self, repository_version, *keys):
+        """
+        Returns the HTTP caching headers of a page generated from a repository version.
+
+        The strong ETag is derived from the repository version served and the keys identifying
+        the page and its representation.
+        """
+        distribution = self.distribution
+        key = ":".join(
+            str(key)
+            for key in (repository_version.pk, self.base_content_url, distribution.base_path, *keys)
+        )
+        # The distribution can be changed to serve an older repository version
+        last_modified = max(
+            repository_version.pulp_created,
+            distribution.pulp_last_updated or distribution.pulp_created,
+        )
+        headers = {
+            "ETag": quote_etag(hashlib.sha256(key.encode()).hexdigest()),
+            "Last-Modified": http_date(last_modified.timestamp()),
+            "Vary": "Accept",
+        }
+        if distribution.cache_max_age is not None:
+            headers["Cache-Control"] = f"max-age={distribution.cache_max_age}"
+        return headers
+
+    @staticmethod
+    def get_not_modified_response(request, headers):
+        """Returns a 304 response if the copy of the page the client has is still valid."""
+        response = get_conditional_response(
+            request,
+            etag=headers["ETag"],
+            last_modified=int(parse_http_date(headers["Last-Modified"])),
+        )
+        if response is not None:
+            for header, value in headers.items():
+                response.headers[header] = value
+        return response
+
+    def get_project_serials(self, repository_version):
+        """Returns the names of the projects with the serial of their last change."""
+        if (project_index := self.get_project_index(repository_version)) is not None:
+            projects = project_index.order_by("name_normalized").values_list(
+                "name", "version_added"
+            )
+            return ((name, version_serial(added)) for name, added in projects.iterator())
+        serial = version_serial(repository_version.number)
+        names = self.get_content(repository_version).order_by("name_normalized")
+        names = names.distinct("name_normalized").values_list("name", flat=True)
+        return ((name, serial) for name in names.iterator())
+
+    def get_changed_projects(self, repository_version, since):
+        """
+        Finds the projects that changed after a version number up to the served repository version.
+
+        The changes are taken from the project index, or from the content diff of the versions
+        when they aren't in it. The version of the last change of a project is only known from the
+        index, the served version is used otherwise.
+
+        Returns:
+            list: The (name, version number of the last change, removed) of the projects ordered
+                by version number, None if the version doesn't exist anymore.
+        """
+        number = repository_version.number
+        if since >= number:
+            return []
+        base = (
+            RepositoryVersion.objects.filter(
+                repository_id=repository_version.repository_id, number=since, complete=True
+            ).first()
+            if since >= 0
+            else None
+        )
+        if base is None:
+            return None
+
+        changes = {}
+        current = set()
+        if base.info.get(PROJECT_INDEX_KEY) and repository_version.info.get(PROJECT_INDEX_KEY):
+            entries = ProjectIndexEntry.objects.changed_between(base, repository_version)
+            for name, normalized, added, removed in entries.values_list(
+                "name", "name_normalized", "version_added", "version_removed"
+            ).iterator():
+                if removed is None or removed > number:
+                    current.add(normalized)
+                changed = max(n for n in (added, removed) if n is not None and since < n <= number)
+                if changed > changes.get(normalized, (None, -1))[1]:
+                    changes[normalized] = (name, changed)
+        else:
+            content = self.get_content(repository_version)
+            base_content = self.get_content(base)
+            for diff in (
+                content.exclude(pk__in=base.content),
+                base_content.exclude(pk__in=repository_version.content),
+            ):
+                names = diff.order_by("name_normalized").distinct("name_normalized")
+                names = names.values_list("name_normalized", "name")
+                changes.update((normalized, (name, number)) for normalized, name in names)
+            current.update(
+                content.filter(name_normalized__in=changes)
+                .order_by("name_normalized")
+                .distinct("name_normalized")
+                .values_list("name_normalized", flat=True)
+            )
+
+        changes = [
+            (name, changed, normalized not in current)
+            for normalized, (name, changed) in changes.items()
+        ]
+        changes.sort(key=itemgetter(1))
+        return changes
+
     def should_redirect(self, repo_version=None):
         """Checks if there is a publication the content app can serve."""
         if self.distribution.publication:
             return True
-        rv = repo_version or self.get_repository_version(self.distribution)
-        return PythonPublication.objects.filter(repository_version=rv).exists()
+        rv = repo_version or self.get_served_version()
+        return self.resolve_once(
+            ("published", rv.pk),
+            lambda: PythonPublication.objects.filter(repository_version=rv).exists(),
+        )
 
     def get_rvc(self):
         """Takes the base_path and returns the repository_version and content."""
         if self.distribution.remote:
             if not self.distribution.repository and not self.distribution.publication:
                 return None, None
-        repo_ver = self.get_repository_version(self.distribution)
+        repo_ver = self.get_served_version()
         content = self.get_content(repo_ver)
         return repo_ver, content
 
@@ -297,26 +577,52 @@ class SimpleView(PackageUploadMixin, ViewSet):
             self.base_api_url, f"{base_path}/integrity/{package}/{version}/{filename}/provenance/"
         )
 
+    @staticmethod
+    def get_cached_page(etag):
+        """Returns the body of a project page from PYTHON_SIMPLE_PAGE_CACHE, if it is cached."""
+        if not settings.PYTHON_SIMPLE_PAGE_CACHE:
+            return None
+        try:
+            return caches[settings.PYTHON_SIMPLE_PAGE_CACHE].get(f"pulp_python:simple:{etag}")
+        except Exception as e:
+            log.warning(f"Failed to read the simple page cache: {e}")
+            return None
+
+    @staticmethod
+    def cache_page(etag, body):
+        """
+        Stores the body of a project page in PYTHON_SIMPLE_PAGE_CACHE.
+
+        The pages are keyed by their ETag, which is derived from the repository version, the
+        project, the media type and the base URL of the page. New repository versions get new
+        keys, the stale pages are left to expire.
+        """
+        if not settings.PYTHON_SIMPLE_PAGE_CACHE:
+            return
+        try:
+            caches[settings.PYTHON_SIMPLE_PAGE_CACHE].set(f"pulp_python:simple:{etag}", body)
+        except Exception as e:
+            log.warning(f"Failed to write the simple page cache: {e}")
+
     @extend_schema(summary="Get index simple page")
     def list(self, request, path):
         """Gets the simple api html page for the index."""
         repo_version, content = self.get_rvc()
         if self.should_redirect(repo_version=repo_version):
             return redirect(urljoin(self.base_content_url, f"{path}/simple/"))
-        names = (
-            content.order_by("name_normalized")
-            .values_list("name", flat=True)
-            .distinct("name_normalized")
-            .iterator()
-        )
         media_type = request.accepted_renderer.media_type
-        headers = {"X-PyPI-Last-Serial": str(PYPI_SERIAL_CONSTANT)}
+        serial = version_serial(repo_version.number)
+        headers = {"X-PyPI-Last-Serial": str(serial)}
+        headers.update(self.get_cache_headers(repo_version, "simple", media_type))
+        if response := self.get_not_modified_response(request, headers):
+            return response
+        projects = self.get_project_serials(repo_version)
 
         if media_type == PYPI_SIMPLE_V1_JSON:
-            index_data = write_simple_index_json(names)
+            index_data = write_simple_index_json(projects, serial)
             return Response(index_data, headers=headers)
         else:
-            index_data = write_simple_index(names, streamed=True)
+            index_data = write_simple_index((name for name, _ in projects), streamed=True)
             kwargs = {"content_type": media_type, "headers": headers}
             return StreamingHttpResponse(index_data, **kwargs)
 
@@ -357,7 +663,7 @@ class SimpleView(PackageUploadMixin, ViewSet):
     @extend_schema(operation_id="pypi_simple_package_read", summary="Get package simple page")
     def retrieve(self, request, path, package):
         """Retrieves the simple api html/json page for a package."""
-        repo_ver, content = self.get_rvc()
+        repo_ver, _ = self.get_rvc()
         # Should I redirect if the normalized name is different?
         normalized = canonicalize_name(package)
         releases = {}
@@ -365,47 +671,47 @@ class SimpleView(PackageUploadMixin, ViewSet):
             releases = self.pull_through_package_simple(normalized, path, self.distribution.remote)
         elif self.should_redirect(repo_version=repo_ver):
             return redirect(urljoin(self.base_content_url, f"{path}/simple/{normalized}/"))
-        if content is not None:
-            local_packages = content.filter(name_normalized=normalized)
-            packages = local_packages.values(
-                "filename",
-                "sha256",
-                "metadata_sha256",
-                "requires_python",
-                "size",
-                "pulp_created",
-                "version",
-            )
-            provenances = PackageProvenance.objects.filter(package__in=local_packages).values_list(
-                "package__filename", flat=True
-            )
-            local_releases = {
-                p["filename"]: {
-                    **p,
-                    "url": urljoin(self.base_content_url, f"{path}/{p['filename']}"),
-                    "upload_time": p["pulp_created"],
-                    "provenance": (
-                        self.get_provenance_url(normalized, p["version"], p["filename"])
-                        if p["filename"] in provenances
-                        else None
-                    ),
-                }
-                for p in packages
+        media_type = request.accepted_renderer.media_type
+        # The pages of pull-through distributions change with the remote, they aren't tracked
+        if self.distribution.remote:
+            serial = PYPI_SERIAL_CONSTANT
+            headers = {"X-PyPI-Last-Serial": str(serial)}
+        else:
+            serial = get_project_serials(repo_ver, [normalized])[normalized]
+            headers = {"X-PyPI-Last-Serial": str(serial)}
+            headers.update(self.get_cache_headers(repo_ver, "simple", normalized, media_type))
+            if response := self.get_not_modified_response(request, headers):
+                return response
+            if (body := self.get_cached_page(headers["ETag"])) is not None:
+                return HttpResponse(body, content_type=media_type, headers=headers)
+        packages = self.get_project_packages(repo_ver, normalized) if repo_ver else []
+        local_releases = {
+            p["filename"]: {
+                **p,
+                "url": urljoin(self.base_content_url, f"{path}/{p['filename']}"),
+                "provenance": (
+                    self.get_provenance_url(normalized, p["version"], p["filename"])
+                    if p["provenance"]
+                    else None
+                ),
             }
-            releases.update(local_releases)
+            for p in packages
+        }
+        releases.update(local_releases)
         if not releases:
             return HttpResponseNotFound(f"{normalized} does not exist.")
 
-        media_type = request.accepted_renderer.media_type
-        headers = {"X-PyPI-Last-Serial": str(PYPI_SERIAL_CONSTANT)}
-
         if media_type == PYPI_SIMPLE_V1_JSON:
-            detail_data = write_simple_detail_json(normalized, releases.values())
-            return Response(detail_data, headers=headers)
+            detail_data = request.accepted_renderer.render(
+                write_simple_detail_json(normalized, releases.values(), serial),
+                request.accepted_media_type,
+                self.get_renderer_context(),
+            )
         else:
             detail_data = write_simple_detail(normalized, releases.values())
-            kwargs = {"content_type": media_type, "headers": headers}
-            return HttpResponse(detail_data, **kwargs)
+        if not self.distribution.remote:
+            self.cache_page(headers["ETag"], detail_data)
+        return HttpResponse(detail_data, content_type=media_type, headers=headers)
 
     @extend_schema(
         request=PackageUploadSerializer,
@@ -447,7 +753,7 @@ class MetadataView(PyPIMixin, ViewSet):
         https://packaging.python.org/specifications/core-metadata/.
         `meta` must be a path in form of `{package}/json/` or `{package}/{version}/json/`
         """
-        repo_ver, content = self.get_rvc()
+        repo_ver, _ = self.get_rvc()
         meta_path = PurePath(meta)
         name = None
         version = None
@@ -459,16 +765,25 @@ class MetadataView(PyPIMixin, ViewSet):
             name = meta_path.parts[0]
         if name:
             normalized = canonicalize_name(name)
-            package_content = content.filter(name_normalized=normalized)
-            # TODO Change this value to the Repo's serial value when implemented
-            headers = {PYPI_LAST_SERIAL: str(PYPI_SERIAL_CONSTANT)}
+            serial = get_project_serials(repo_ver, [normalized])[normalized]
+            headers = {PYPI_LAST_SERIAL: str(serial)}
+            headers.update(self.get_cache_headers(repo_ver, "pypi", normalized, version))
+            if response := self.get_not_modified_response(request, headers):
+                return response
             if settings.DOMAIN_ENABLED:
                 domain = get_domain()
-            json_body = python_content_to_json(
-                path, package_content, version=version, domain=domain
+            json_body = get_project_json(
+                repo_ver,
+                path,
+                normalized,
+                release=version,
+                domain=domain,
+                last_serial=serial,
+                streamed=True,
             )
-            if json_body:
-                return Response(data=json_body, headers=headers)
+            if json_body is not None:
+                kwargs = {"content_type": "application/json", "headers": headers}
+                return StreamingHttpResponse(json_body, **kwargs)
         return Response(status="404")
 
 
@@ -489,11 +804,9 @@ class PyPIView(PyPIMixin, ViewSet):
     @extend_schema(responses={200: SummarySerializer}, summary="Get index summary")
     def retrieve(self, request, path):
         """Gets package summary stats of index."""
-        repo_ver, content = self.get_rvc()
-        files = content.count()
-        releases = content.distinct("name", "version").count()
-        projects = content.distinct("name").count()
-        data = {"projects": projects, "releases": releases, "files": files}
+        repo_ver, _ = self.get_rvc()
+        # The summary is computed when the repository version is created
+        data = repo_ver.info.get(SUMMARY_KEY) or summarize_repository_version(repo_ver)
         return Response(data=data)
 
 
@@ -553,3 +866,151 @@ class ProvenanceView(PyPIMixin, ViewSet):
                 if provenance:
                     return Response(data=provenance.provenance)
         return HttpResponseNotFound(f"{package} {version} {filename} provenance does not exist.")
+
+
+class ChangesView(PyPIMixin, ViewSet):
+    """View for the projects changed in an index, for mirrors syncing incrementally."""
+
+    endpoint_name = "changes"
+    DEFAULT_ACCESS_POLICY = {
+        "statements": [
+            {
+                "action": ["list"],
+                "principal": "*",
+                "effect": "allow",
+            },
+        ],
+    }
+
+    @extend_schema(
+        parameters=[ChangesQuerySerializer],
+        responses={200: ChangedProjectsSerializer},
+        summary="Get changed projects",
+    )
+    def list(self, request, path):
+        """
+        Lists the projects changed after a serial, or a repository version number, of the index.
+        """
+        query = ChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        repo_ver, _ = self.get_rvc()
+        if repo_ver is None:
+            return HttpResponseNotFound("The index has no repository to track changes of.")
+        since = query.validated_data.get("since_version")
+        if since is None:
+            since = query.validated_data["since"] - PYPI_SERIAL_CONSTANT
+
+        serial = version_serial(repo_ver.number)
+        changes = self.get_changed_projects(repo_ver, since)
+        if changes is None:
+            projects = [
+                {"name": name, "last_serial": serial, "removed": False}
+                for name, _ in self.get_project_serials(repo_ver)
+            ]
+        else:
+            projects = [
+                {"name": name, "last_serial": version_serial(changed), "removed": removed}
+                for name, changed, removed in changes
+            ]
+        data = {"last_serial": serial, "full_list": changes is None, "projects": projects}
+        return Response(data=data, headers={PYPI_LAST_SERIAL: str(serial)})
+
+
+class XMLRPCView(PyPIMixin, ViewSet):
+    """
+    View for the PyPI XML-RPC API.
+
+    Only the methods mirrors use to find the projects that changed are implemented, they let
+    another Pulp or bandersnatch sync incrementally from the index.
+    """
+
+    endpoint_name = "xmlrpc"
+    DEFAULT_ACCESS_POLICY = {
+        "statements": [
+            {
+                "action": ["create"],
+                "principal": "*",
+                "effect": "allow",
+            },
+        ],
+    }
+    # The supported methods mapped to the types of their parameters
+    METHODS = {
+        "changelog_last_serial": (),
+        "changelog_since_serial": (int,),
+        "list_packages_with_serial": (),
+    }
+
+    @extend_schema(exclude=True)
+    def create(self, request, path):
+        """Dispatches an XML-RPC call."""
+        if len(request.body) > MAX_XMLRPC_REQUEST_SIZE:
+            return HttpResponseBadRequest(reason="XML-RPC request is too large")
+        try:
+            params, method = xmlrpc.client.loads(request.body)
+        except (ExpatError, ValueError):
+            return HttpResponseBadRequest(reason="Invalid XML-RPC request")
+
+        repo_ver, _ = self.get_rvc()
+        if method not in self.METHODS:
+            result = xmlrpc.client.Fault(-32601, f"Method {method} is not supported")
+        elif repo_ver is None:
+            result = xmlrpc.client.Fault(1, "The index has no repository to track changes of")
+        elif not self.valid_params(params, self.METHODS[method]):
+            result = xmlrpc.client.Fault(-32602, f"Invalid parameters for {method}")
+        else:
+            result = (getattr(self, method)(repo_ver, *params),)
+        body = xmlrpc.client.dumps(result, methodresponse=True, allow_none=True)
+        return HttpResponse(body, content_type="text/xml")
+
+    @staticmethod
+    def valid_params(params, types):
+        """Checks the parameters of a call against the types of the method parameters."""
+        # XML-RPC booleans are unmarshalled as bool, a subclass of int
+        return len(params) == len(types) and all(
+            isinstance(param, param_type) and not isinstance(param, bool)
+            for param, param_type in zip(params, types)
+        )
+
+    @staticmethod
+    def changelog_last_serial(repository_version):
+        """Returns the serial of the served repository version."""
+        return version_serial(repository_version.number)
+
+    def list_packages_with_serial(self, repository_version):
+        """Returns the names of the projects mapped to the serial of their last change."""
+        return dict(self.get_project_serials(repository_version))
+
+    def changelog_since_serial(self, repository_version, since_serial):
+        """
+        Returns the changes of the projects after a serial, in the form of the PyPI changelog.
+
+        When the changes can't be known every project is reported as changed in the served version.
+        The changes are of whole projects, their version is an empty string.
+        """
+        since = since_serial - PYPI_SERIAL_CONSTANT
+        changes = self.get_changed_projects(repository_version, since)
+        if changes is None:
+            timestamp = int(repository_version.pulp_created.timestamp())
+            serial = version_serial(repository_version.number)
+            return [
+                [name, "", timestamp, "update", serial]
+                for name, _ in self.get_project_serials(repository_version)
+            ]
+
+        created = dict(
+            RepositoryVersion.objects.filter(
+                repository_id=repository_version.repository_id,
+                number__in={changed for _, changed, _ in changes},
+            ).values_list("number", "pulp_created")
+        )
+        return [
+            [
+                name,
+                "",
+                int(created.get(changed, repository_version.pulp_created).timestamp()),
+                "remove project" if removed else "update",
+                version_serial(changed),
+            ]
+            for name, changed, removed in changes
+        ]
@@ -104,6 +104,16 @@ class PythonDistributionSerializer(core_serializers.DistributionSerializer):
         queryset=core_models.Remote.objects.all(),
         allow_null=True,
     )
+    cache_max_age = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        allow_null=True,
+        help_text=_(
+            "The max-age in seconds of the Cache-Control header of the index pages served by "
+            "the PyPI APIs. Not set by default, letting clients revalidate the pages with their "
+            "ETag."
+        ),
+    )
 
     def get_base_url(self, obj):
         """Gets the base url."""
@@ -117,6 +127,7 @@ class PythonDistributionSerializer(core_serializers.DistributionSerializer):
             "repository_version",
             "allow_uploads",
             "remote",
+            "cache_max_age",
         )
         model = python_models.PythonDistribution
 
@@ -744,6 +755,17 @@ class PythonRemoteSerializer(core_serializers.RemoteSerializer):
         help_text=_("Whether to sync available provenances for Python packages."),
         default=False,
     )
+    sync_api = serializers.ChoiceField(
+        required=False,
+        help_text=_(
+            "The API used to list the projects of the remote when syncing without includes. "
+            "'xmlrpc' uses the XML-RPC API, falling back to the simple index. 'simple' uses the "
+            "simple index directly, in its PEP 691 JSON form when available. 'xmlrpc' is the "
+            "default."
+        ),
+        choices=python_models.SYNC_APIS,
+        default="xmlrpc",
+    )
 
     def validate_includes(self, value):
         """Validates the includes"""
@@ -776,6 +798,7 @@ class PythonRemoteSerializer(core_serializers.RemoteSerializer):
             "keep_latest_packages",
             "exclude_platforms",
             "provenance",
+            "sync_api",
         )
         model = python_models.PythonRemote
 
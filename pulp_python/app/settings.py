@@ -1,6 +1,9 @@
 import socket
 
 PYTHON_GROUP_UPLOADS = False
+PYTHON_PUBLISH_WORKERS = 0
+PYTHON_DISTRIBUTION_CACHE_TTL = 0
+PYTHON_SIMPLE_PAGE_CACHE = None
 PYPI_API_HOSTNAME = "https://" + socket.getfqdn()
 PYPI_PATH_PREFIX = "/pypi/"
 
@@ -1,19 +1,42 @@
 from gettext import gettext as _
+import json
 import logging
+import multiprocessing
 import os
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby, islice
+from operator import attrgetter, itemgetter
 
+import django
+from django.conf import settings
 from django.core.files import File
+from django.db import transaction
 from packaging.utils import canonicalize_name
 
 from pulpcore.plugin import models
 from pulpcore.plugin.util import get_domain
 
 from pulp_python.app import models as python_models
+from pulp_python.app.models import PROJECT_INDEX_KEY
 from pulp_python.app.serializers import PythonPublicationSerializer
-from pulp_python.app.utils import write_simple_index, write_simple_detail
+from pulp_python.app.utils import (
+    COMPRESSED_FILE_EXTENSIONS,
+    compress,
+    write_simple_detail,
+    write_simple_detail_json,
+    write_simple_index,
+    write_simple_index_json,
+    version_serial,
+)
 
 log = logging.getLogger(__name__)
 
+PUBLISH_BATCH_SIZE = 1000
+HASHING_WORKERS = 4
+PROJECT_PAGES = ("index.html", "index.json")
+COMPRESS_MIN_SIZE = 1024
+
 
 def publish(repository_version_pk):
     """
@@ -47,6 +70,9 @@ def write_simple_api(publication):
     Writes metadata mimicking the simple api of PyPI for all python packages
     in the repository version.
 
+    The pages of the projects that didn't change since the previous publication of the
+    repository are reused from it instead of being rendered again.
+
     https://wiki.python.org/moin/PyPISimple
 
     Args:
@@ -70,10 +96,21 @@ def write_simple_api(publication):
     with open(index_path, "w") as index:
         index.write(write_simple_index(project_names))
 
-    index_metadata = models.PublishedMetadata.create_from_file(
-        relative_path=index_path, publication=publication, file=File(open(index_path, "rb"))
-    )
-    index_metadata.save()
+    # and its PEP 691 JSON form, with the serials of the projects
+    repository_version = publication.repository_version
+    serials = python_models.get_project_serials(repository_version)
+    projects = ((name, serials[canonicalize_name(name)]) for name in project_names.iterator())
+    json_index_path = f"{simple_dir}index.json"
+    with open(json_index_path, "w") as index:
+        last_serial = version_serial(repository_version.number)
+        json.dump(write_simple_index_json(projects, last_serial), index)
+
+    index_paths = [index_path, json_index_path]
+    for index_path in index_paths + compress_pages(index_paths):
+        index_metadata = models.PublishedMetadata.create_from_file(
+            relative_path=index_path, publication=publication, file=File(open(index_path, "rb"))
+        )
+        index_metadata.save()
 
     if len(project_names) == 0:
         return
@@ -81,47 +118,263 @@ def write_simple_api(publication):
     packages = python_models.PythonPackageContent.objects.filter(
         pk__in=publication.repository_version.content, _pulp_domain=domain
     )
-    releases = packages.order_by("name_normalized").values("name", "filename", "sha256")
-
-    ind = 0
-    current_name = canonicalize_name(project_names[ind])
-    package_releases = []
-    for release in releases.iterator():
-        if canonicalize_name(release["name"]) != current_name:
-            write_project_page(
-                name=current_name,
-                simple_dir=simple_dir,
-                package_releases=package_releases,
-                publication=publication,
-            )
-            package_releases = []
-            ind += 1
-            current_name = canonicalize_name(project_names[ind])
-        relative_path = release["filename"]
-        path = f"../../{relative_path}"
-        checksum = release["sha256"]
-        package_releases.append({"filename": relative_path, "url": path, "sha256": checksum})
-    # Write the final project's page
-    write_project_page(
-        name=canonicalize_name(current_name),
-        simple_dir=simple_dir,
-        package_releases=package_releases,
-        publication=publication,
+    if reusable_pages := get_reusable_project_pages(publication, simple_dir):
+        publish_metadata(publication, reusable_pages.items())
+        names = set(canonicalize_name(name) for name in project_names.iterator())
+        names.difference_update(page.split("/")[1] for page in reusable_pages)
+        packages = packages.filter(name_normalized__in=names)
+    releases = packages.order_by("name_normalized").values(
+        "name_normalized",
+        "filename",
+        "sha256",
+        "metadata_sha256",
+        "requires_python",
+        "size",
+        "pulp_created",
+        "version",
+    )
+
+    projects = (
+        (name, list(project_releases), serials[name])
+        for name, project_releases in groupby(
+            releases.iterator(), key=itemgetter("name_normalized")
+        )
+    )
+
+    # The pages are rendered in shards, hashed in a pool and published in bulk
+    with ThreadPoolExecutor(max_workers=HASHING_WORKERS) as pool:
+        for pages in render_shards(simple_dir, batched(projects, PUBLISH_BATCH_SIZE)):
+            publish_metadata_files(publication, pages, pool)
+
+
+def batched(iterable, size):
+    """Split an iterable into lists of the given size."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def render_shards(simple_dir, shards):
+    """
+    Render the project pages of shards of projects, yielding their relative paths.
+
+    Each shard is a range of projects ordered by normalized name. When PYTHON_PUBLISH_WORKERS is
+    set the shards are rendered in parallel by a pool of spawned processes, forking the worker
+    would copy its threads and open connections into the processes.
+    """
+    workers = settings.PYTHON_PUBLISH_WORKERS
+    if workers <= 1:
+        for shard in shards:
+            yield render_project_pages(simple_dir, shard)
+        return
+
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=django.setup) as pool:
+        pending = deque()
+        for shard in shards:
+            pending.append(pool.apply_async(render_project_pages, (simple_dir, shard)))
+            # Don't read the projects further ahead than the workers can render them
+            if len(pending) > workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def render_project_pages(simple_dir, projects):
+    """Render the pages of a shard of projects, returns their relative paths."""
+    return [
+        relative_path
+        for name, releases, serial in projects
+        for relative_path in write_project_page(name, simple_dir, releases, serial)
+    ]
+
+
+def get_reusable_project_pages(publication, simple_dir):
+    """
+    Find the project pages of the previous publication of the repository that are still valid.
+
+    Pages can only be reused when both repository versions are in the project index.
+
+    Returns:
+        dict: The relative path of the reusable pages mapped to the pk of their artifact.
+    """
+    repository_version = publication.repository_version
+    previous = (
+        python_models.PythonPublication.objects.filter(
+            complete=True,
+            repository_version__repository=repository_version.repository,
+            repository_version__number__lte=repository_version.number,
+        )
+        .exclude(pk=publication.pk)
+        .select_related("repository_version")
+        .order_by("-repository_version__number", "-pulp_created")
+        .first()
     )
+    if not previous:
+        return {}
 
+    # The changed projects are known from the project index of both repository versions
+    base_version = previous.repository_version
+    if not (
+        base_version.info.get(PROJECT_INDEX_KEY) and repository_version.info.get(PROJECT_INDEX_KEY)
+    ):
+        return {}
+    changed = set(
+        python_models.ProjectIndexEntry.objects.changed_between(
+            base_version, repository_version
+        ).values_list("name_normalized", flat=True)
+    )
 
-def write_project_page(name, simple_dir, package_releases, publication):
-    """Writes a project's simple page."""
+    pages = models.PublishedArtifact.objects.filter(
+        publication=previous, relative_path__startswith=simple_dir
+    )
+    projects = defaultdict(dict)
+    for relative_path, artifact_pk in pages.values_list(
+        "relative_path", "content_artifact__artifact"
+    ).iterator():
+        parts = relative_path.split("/")
+        # Only the files of the project directories, not the root index
+        if len(parts) == 3 and parts[1] not in changed:
+            projects[parts[1]][parts[2]] = (relative_path, artifact_pk)
+    # Publications made before all of the pages were published have their projects rendered,
+    # the compressed pages are reused as they are.
+    return {
+        relative_path: artifact_pk
+        for project_files in projects.values()
+        if all(page in project_files for page in PROJECT_PAGES)
+        for relative_path, artifact_pk in project_files.values()
+    }
+
+
+def publish_metadata_files(publication, relative_paths, pool):
+    """
+    Create the artifacts of metadata files and publish them.
+
+    The files are hashed in the pool and the new artifacts are created in bulk, the artifacts
+    of files with the same content as an existing artifact are reused. The file of a reused
+    artifact is stored again if it is missing from the storage.
+    """
+    if not relative_paths:
+        return
+    artifacts = list(
+        pool.map(models.Artifact.init_and_validate, map(os.path.abspath, relative_paths))
+    )
+    new_artifacts = {artifact.sha256: artifact for artifact in artifacts}
+
+    existing = models.Artifact.objects.filter(
+        sha256__in=new_artifacts.keys(), pulp_domain=publication.pulp_domain
+    )
+    existing.touch()
+    saved_artifacts = {artifact.sha256: artifact for artifact in existing}
+    storage = publication.pulp_domain.get_storage()
+    reused = list(saved_artifacts.values())
+    stored = pool.map(storage.exists, (artifact.file.name for artifact in reused))
+    for artifact, exists in zip(reused, stored):
+        if not exists:
+            # Saving the artifact with a new file moves the file into the storage
+            artifact.file = new_artifacts[artifact.sha256].file
+            artifact.save()
+    new_artifacts = [
+        artifact for sha256, artifact in new_artifacts.items() if sha256 not in saved_artifacts
+    ]
+    # Sorted to avoid deadlocks with concurrent inserts of the same artifacts
+    new_artifacts.sort(key=attrgetter("sha256"))
+    for artifact in models.Artifact.objects.bulk_get_or_create(new_artifacts):
+        saved_artifacts[artifact.sha256] = artifact
+
+    publish_metadata(
+        publication,
+        (
+            (relative_path, saved_artifacts[artifact.sha256].pk)
+            for relative_path, artifact in zip(relative_paths, artifacts)
+        ),
+    )
+
+
+def publish_metadata(publication, pages, batch_size=PUBLISH_BATCH_SIZE):
+    """
+    Publish metadata files whose artifacts already exist.
+
+    PublishedMetadata is a multi-table model and can't be created in bulk, the content artifacts
+    and published artifacts are.
+
+    Args:
+        publication (pulpcore.plugin.models.Publication): The publication of the metadata
+        pages (iterable): The relative paths of the files with the pk of their artifact
+        batch_size (int): The number of files published in a transaction
+    """
+    pages = list(pages)
+    for i in range(0, len(pages), batch_size):
+        with transaction.atomic():
+            content_artifacts = []
+            for relative_path, artifact_pk in pages[i : i + batch_size]:
+                project_metadata = models.PublishedMetadata(
+                    relative_path=relative_path, publication=publication
+                )
+                project_metadata.save()
+                content_artifacts.append(
+                    models.ContentArtifact(
+                        relative_path=relative_path,
+                        content=project_metadata,
+                        artifact_id=artifact_pk,
+                    )
+                )
+            models.ContentArtifact.objects.bulk_create(content_artifacts)
+            models.PublishedArtifact.objects.bulk_create(
+                models.PublishedArtifact(
+                    relative_path=ca.relative_path, content_artifact=ca, publication=publication
+                )
+                for ca in content_artifacts
+            )
+
+
+def write_project_page(name, simple_dir, releases, serial):
+    """Writes a project's simple pages, in HTML and JSON, returns their relative paths."""
     project_dir = f"{simple_dir}{name}/"
     os.mkdir(project_dir)
-    metadata_relative_path = f"{project_dir}index.html"
+    html_relative_path = f"{project_dir}index.html"
+    json_relative_path = f"{project_dir}index.json"
 
-    with open(metadata_relative_path, "w") as simple_metadata:
+    package_releases = [
+        {
+            "filename": release["filename"],
+            "url": f"../../{release['filename']}",
+            "sha256": release["sha256"],
+        }
+        for release in releases
+    ]
+    with open(html_relative_path, "w") as simple_metadata:
         simple_metadata.write(write_simple_detail(name, package_releases))
 
-    project_metadata = models.PublishedMetadata.create_from_file(
-        relative_path=metadata_relative_path,
-        publication=publication,
-        file=File(open(metadata_relative_path, "rb")),
-    )
-    project_metadata.save()  # change to bulk create when multi-table supported
+    package_releases = [
+        {
+            **release,
+            "url": f"../../{release['filename']}",
+            "upload_time": release["pulp_created"],
+        }
+        for release in releases
+    ]
+    with open(json_relative_path, "w") as simple_metadata:
+        json.dump(write_simple_detail_json(name, package_releases, serial), simple_metadata)
+
+    relative_paths = [html_relative_path, json_relative_path]
+    return relative_paths + compress_pages(relative_paths)
+
+
+def compress_pages(relative_paths):
+    """
+    Write the precompressed copies of pages next to them, returns their relative paths.
+
+    The content app serves them to the clients accepting their encoding, small pages are left
+    uncompressed.
+    """
+    compressed_paths = []
+    for relative_path in relative_paths:
+        if os.path.getsize(relative_path) < COMPRESS_MIN_SIZE:
+            continue
+        with open(relative_path, "rb") as page:
+            data = page.read()
+        for encoding, extension in COMPRESSED_FILE_EXTENSIONS.items():
+            with open(f"{relative_path}{extension}", "wb") as compressed_page:
+                compressed_page.write(compress(data, encoding))
+            compressed_paths.append(f"{relative_path}{extension}")
+    return compressed_paths
@@ -12,8 +12,9 @@ from pulp_python.app.utils import (
     artifact_to_python_content_data,
     fetch_json_release_metadata,
     parse_metadata,
+    version_key,
 )
-from pulpcore.plugin.models import Artifact, ContentArtifact, ProgressReport
+from pulpcore.plugin.models import Artifact, ContentArtifact, ProgressReport, RepositoryContent
 from pulpcore.plugin.util import get_domain
 
 log = logging.getLogger(__name__)
@@ -96,6 +97,7 @@ def repair_metadata(content: QuerySet[PythonPackageContent]) -> tuple[int, set[s
     batch = []
     set_of_update_fields = set()
     total_repaired = 0
+    repaired_pks = set()
     # Keep track of on-demand packages that were not repaired
     pkgs_not_repaired = set()
 
@@ -127,7 +129,7 @@ def repair_metadata(content: QuerySet[PythonPackageContent]) -> tuple[int, set[s
                 pkgs_metadata_not_repaired,
             )
             total_repaired += update_package_if_needed(
-                package, new_data, batch, set_of_update_fields
+                package, new_data, batch, set_of_update_fields, repaired_pks
             )
 
         # For on-demand content, we expect that:
@@ -175,7 +177,7 @@ def repair_metadata(content: QuerySet[PythonPackageContent]) -> tuple[int, set[s
                     new_data = parse_metadata(json_data["info"], version, dist_data)
                     new_data.pop("url")  # url belongs to RemoteArtifact
                     total_repaired += update_package_if_needed(
-                        package, new_data, batch, set_of_update_fields
+                        package, new_data, batch, set_of_update_fields, repaired_pks
                     )
                     group_set.remove(package)
                     progress_report.increment()
@@ -192,6 +194,8 @@ def repair_metadata(content: QuerySet[PythonPackageContent]) -> tuple[int, set[s
         pkgs_metadata_not_repaired.update(not_repaired)
         total_metadata_repaired += len(metadata_batch) - len(not_repaired)
 
+    reindex_repositories(repaired_pks)
+
     return total_repaired, pkgs_not_repaired, total_metadata_repaired, pkgs_metadata_not_repaired
 
 
@@ -200,16 +204,18 @@ def update_package_if_needed(
     new_data: dict,
     batch: list[PythonPackageContent],
     set_of_update_fields: set[str],
+    repaired_pks: set[UUID],
 ) -> int:
     """
     Compares the current package data with new data and updates the package
-    if needed ("batch" and "set_of_update_fields" are updated in-place).
+    if needed ("batch", "set_of_update_fields" and "repaired_pks" are updated in-place).
 
     Args:
         package: Package to check and update.
         new_data: A dict of new field values to compare against the package.
         batch: A list of packages that were updated.
         set_of_update_fields: A set of package field names that were updated.
+        repaired_pks: A set of the PKs of all the packages that were updated.
 
     Returns:
         The count of repaired packages (increments in multiples of BULK_SIZE only).
@@ -221,8 +227,14 @@ def update_package_if_needed(
             setattr(package, field, value)
             set_of_update_fields.add(field)
             changed = True
+    # bulk_update() doesn't run the hooks of the model, keep the version key in sync here
+    if package.version_key != (key := version_key(package.version)):
+        package.version_key = key
+        set_of_update_fields.add("version_key")
+        changed = True
     if changed:
         batch.append(package)
+        repaired_pks.add(package.pk)
 
     if len(batch) == BULK_SIZE:
         PythonPackageContent.objects.bulk_update(batch, set_of_update_fields)
@@ -233,6 +245,28 @@ def update_package_if_needed(
     return total_repaired
 
 
+def reindex_repositories(content_pks: set[UUID]) -> None:
+    """
+    Rebuilds the project index of the repositories with a version containing repaired packages.
+
+    The packages are repaired in place, without creating new repository versions, so the files
+    and info of their projects indexed by these repositories are stale.
+
+    Args:
+        content_pks: The PKs of the repaired packages.
+    """
+    content_pks = list(content_pks)
+    repository_pks = set()
+    for i in range(0, len(content_pks), BULK_SIZE):
+        repository_pks.update(
+            RepositoryContent.objects.filter(content__in=content_pks[i : i + BULK_SIZE])
+            .values_list("repository", flat=True)
+            .distinct()
+        )
+    for repository in PythonRepository.objects.filter(pk__in=repository_pks):
+        repository.reindex_projects()
+
+
 def update_metadata_artifact_if_needed(
     package: PythonPackageContent,
     new_metadata_sha256: str | None,
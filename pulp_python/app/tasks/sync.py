@@ -1,15 +1,28 @@
 import logging
 import asyncio
+import tempfile
 
 from aiohttp import ClientResponseError, ClientError
 from lxml.etree import LxmlError
+from contextlib import aclosing
 from gettext import gettext as _
 from functools import partial
 
+from asgiref.sync import sync_to_async
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from rest_framework import serializers
 
 from pulpcore.plugin.download import HttpDownloader
-from pulpcore.plugin.models import Artifact, ProgressReport, Remote, Repository
+from pulpcore.plugin.models import (
+    Artifact,
+    Content,
+    ContentArtifact,
+    ProgressReport,
+    Remote,
+    RemoteArtifact,
+)
 from pulpcore.plugin.stages import (
     DeclarativeArtifact,
     DeclarativeContent,
@@ -18,22 +31,37 @@ from pulpcore.plugin.stages import (
 )
 
 from pulp_python.app.models import (
+    ProjectSyncState,
     PythonPackageContent,
     PythonRemote,
+    PythonRepository,
     PackageProvenance,
 )
-from pulp_python.app.utils import parse_metadata, PYPI_LAST_SERIAL, aget_remote_simple_page
-from pypi_simple import IndexPage
+from pulp_python.app.utils import (
+    aget_remote_simple_page,
+    canonicalize_name,
+    parse_core_metadata,
+    parse_metadata,
+    parse_simple_index,
+    simple_page_to_releases,
+    PYPI_LAST_SERIAL,
+    PYPI_SIMPLE_V1_JSON,
+)
+from pypi_simple import ACCEPT_JSON_PREFERRED, ProjectPage
 from pypi_attestations import Provenance
+from pydantic import TypeAdapter
 
+from bandersnatch.errors import PackageNotFound
 from bandersnatch.mirror import Mirror
 from bandersnatch.master import Master
 from bandersnatch.configuration import BandersnatchConfig
 from packaging.requirements import Requirement
-from urllib.parse import urljoin
+from packaging.version import parse, InvalidVersion
 
 logger = logging.getLogger(__name__)
 
+PROVENANCE_ADAPTER = TypeAdapter(Provenance)
+
 
 def sync(remote_pk, repository_pk, mirror):
     """
@@ -51,13 +79,88 @@ def sync(remote_pk, repository_pk, mirror):
 
     """
     remote = PythonRemote.objects.get(pk=remote_pk)
-    repository = Repository.objects.get(pk=repository_pk)
+    repository = PythonRepository.objects.get(pk=repository_pk)
 
     if not remote.url:
         raise serializers.ValidationError(detail=_("A remote must have a url attribute to sync."))
 
-    first_stage = PythonBanderStage(remote)
-    DeclarativeVersion(first_stage, repository, mirror).create()
+    incremental = is_last_sync_current(repository, remote, mirror)
+    serial = 0
+    project_states = {}
+    if incremental:
+        if not remote.includes:
+            serial = int(repository.last_sync_details.get("serial") or 0)
+        project_states = {
+            name: (etag, last_modified, project_serial)
+            for name, etag, last_modified, project_serial in ProjectSyncState.objects.filter(
+                repository=repository, remote=remote
+            )
+            .values_list("name", "etag", "last_modified", "serial")
+            .iterator()
+        }
+
+    first_stage = PythonBanderStage(
+        remote,
+        serial=serial,
+        project_states=project_states,
+        repository_version=repository.latest_version(),
+    )
+    PythonDeclarativeVersion(first_stage, repository, mirror).create()
+    save_sync_state(repository, remote, mirror, first_stage, incremental)
+
+
+def is_last_sync_current(repository, remote, mirror):
+    """
+    Whether the state recorded by the last sync of the repository can be used by this sync.
+
+    The state is only reused when nothing that could affect the result of the sync has changed
+    since it was recorded: the remote (including its filters), the sync mode and the repository
+    content.
+    """
+    details = repository.last_sync_details
+    return bool(details) and (
+        details.get("remote_pk") == str(remote.pk)
+        and details.get("remote_last_updated") == remote.pulp_last_updated.isoformat()
+        and details.get("mirror") == mirror
+        and details.get("repository_version") == repository.latest_version().number
+    )
+
+
+def save_sync_state(repository, remote, mirror, first_stage, incremental):
+    """
+    Record the serial and the project states reached by the sync for the next sync to use.
+
+    Only the projects that were synced successfully have their state updated. When the sync
+    wasn't incremental the states recorded by previous syncs are discarded.
+    """
+    with transaction.atomic():
+        if not incremental:
+            ProjectSyncState.objects.filter(repository=repository).delete()
+        ProjectSyncState.objects.bulk_create(
+            [
+                ProjectSyncState(
+                    repository=repository,
+                    remote=remote,
+                    name=name,
+                    etag=etag,
+                    last_modified=last_modified,
+                    serial=serial,
+                )
+                for name, (etag, last_modified, serial) in first_stage.new_project_states.items()
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["repository", "remote", "name"],
+            update_fields=["etag", "last_modified", "serial"],
+        )
+        repository.last_sync_details = {
+            "remote_pk": str(remote.pk),
+            "remote_last_updated": remote.pulp_last_updated.isoformat(),
+            "mirror": mirror,
+            "serial": first_stage.target_serial,
+            "repository_version": repository.latest_version().number,
+        }
+        repository.save(update_fields=["last_sync_details"])
 
 
 def create_bandersnatch_config(remote):
@@ -103,10 +206,25 @@ class PythonBanderStage(Stage):
     Python Package Syncing Stage using Bandersnatch
     """
 
-    def __init__(self, remote):
+    def __init__(self, remote, serial=0, project_states=None, repository_version=None):
         """Initialize the stage and Bandersnatch config"""
         super().__init__()
         self.remote = remote
+        self.repository_version = repository_version
+        # sha256 digest of the packages in the repository version -> (package pk, provenance pk)
+        self.present_packages = {}
+        # pks of the content in the repository version that was found upstream
+        self.present_content = set()
+        self.serial = serial
+        # (etag, last_modified, serial) of the projects, as recorded by the last sync
+        self.project_states = project_states or {}
+        self.new_project_states = {}
+        # Serial the repository is consistently synced to once the sync is done
+        self.target_serial = 0
+        # Normalized names of the projects the sync was limited to, None means all of them
+        self.synced_projects = None
+        self.failed_projects = set()
+        self.unchanged_projects = set()
         create_bandersnatch_config(remote)
 
     async def run(self):
@@ -119,7 +237,15 @@ class PythonBanderStage(Stage):
         if not isinstance(downloader, HttpDownloader):
             raise ValueError("Only HTTP(S) is supported for python syncing")
 
-        async with Master(url, allow_non_https=True) as master:
+        if self.repository_version:
+            await sync_to_async(self.load_present_packages)()
+
+        async with PulpMaster(
+            url,
+            self.project_states,
+            simple=self.remote.sync_api == "simple",
+            allow_non_https=True,
+        ) as master:
             # Replace the session with the remote's downloader session
             old_session = master.session
             master.session = downloader.session
@@ -138,7 +264,7 @@ class PythonBanderStage(Stage):
                 message="Fetching Project Metadata", code="sync.fetching.project"
             ) as p:
                 pmirror = PulpMirror(
-                    serial=0,  # Serial currently isn't supported by Pulp
+                    serial=self.serial,
                     master=master,
                     workers=workers,
                     deferred_download=deferred_download,
@@ -148,10 +274,205 @@ class PythonBanderStage(Stage):
                 packages_to_sync = None
                 if self.remote.includes:
                     packages_to_sync = [Requirement(pkg).name for pkg in self.remote.includes]
-                await pmirror.synchronize(packages_to_sync)
+                try:
+                    await pmirror.synchronize(packages_to_sync)
+                    await pmirror.wait_for_provenance()
+                finally:
+                    # Don't leave provenance being fetched behind when the sync fails
+                    await pmirror.cancel_provenance()
+                if packages_to_sync is None:
+                    # Changes after the previous serial are synced again if a project failed
+                    serial = self.serial if pmirror.errors else pmirror.target_serial
+                    self.target_serial = int(serial or 0)
             # place back old session so that it is properly closed
             master.session = old_session
 
+    def load_present_packages(self):
+        """
+        Load the digests of the packages in the repository version being synced into.
+
+        Only the packages this sync has nothing to do for are loaded: the ones with all of their
+        artifacts downloaded when the remote's policy is immediate, otherwise the ones that can
+        be downloaded from this remote. The other packages are declared again, for their
+        artifacts or remote artifacts to be created.
+        """
+        content = self.repository_version.content
+        provenances = dict(
+            PackageProvenance.objects.filter(pk__in=content)
+            .values_list("package_id", "pk")
+            .iterator()
+        )
+        packages = PythonPackageContent.objects.filter(pk__in=content)
+        if self.remote.policy == Remote.IMMEDIATE:
+            missing_artifacts = ContentArtifact.objects.filter(
+                content=OuterRef("pk"), artifact__isnull=True
+            )
+            packages = packages.exclude(Exists(missing_artifacts))
+        else:
+            remote_artifacts = RemoteArtifact.objects.filter(
+                content_artifact__content=OuterRef("pk"), remote=self.remote
+            )
+            packages = packages.filter(Exists(remote_artifacts))
+        for pk, sha256 in packages.values_list("pk", "sha256").iterator():
+            self.present_packages[bytes.fromhex(sha256)] = (pk, provenances.get(pk))
+
+
+class PulpMaster(Master):
+    """
+    Bandersnatch Master that makes conditional requests for the metadata of the projects
+
+    When `simple` is set the metadata is built from the simple API page of the project instead
+    of the PyPI JSON API, the page is kept in `simple_pages` to be reused when creating content.
+    """
+
+    def __init__(self, url, project_states, simple=False, **kwargs):
+        """Initialize Bandersnatch Master with the project states of the last sync"""
+        super().__init__(url, **kwargs)
+        self.project_states = project_states
+        self.simple = simple
+        self.fetched_states = {}
+        self.not_modified = set()
+        self.simple_pages = {}
+
+    def conditional_headers(self, package_name):
+        """Get the headers validating the metadata fetched by the last sync of the project."""
+        headers = {}
+        if state := self.project_states.get(package_name):
+            etag, last_modified, _ = state
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    async def get_package_metadata(self, package_name, serial=0):
+        """
+        Fetch the JSON metadata of the project, None is returned if it wasn't modified.
+
+        The validators of the response are kept in `fetched_states` for the project.
+        """
+        if self.simple:
+            return await self.get_simple_package_metadata(package_name, serial)
+
+        path = f"/pypi/{package_name}/json"
+        headers = self.conditional_headers(package_name)
+
+        # The serial is checked after the request, a 304 response might not carry it
+        async with aclosing(self.get(path, None, headers=headers)) as responses:
+            async for response in responses:
+                if response.status == 304:
+                    self.not_modified.add(package_name)
+                    return None
+                if response.status == 404:
+                    raise PackageNotFound(package_name)
+                response.raise_for_status()
+                got_serial = response.headers.get(PYPI_LAST_SERIAL)
+                await self.check_for_stale_cache(
+                    path, serial, int(got_serial) if got_serial else None
+                )
+                metadata = await response.json()
+                self.fetched_states[package_name] = (
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    int(metadata.get("last_serial") or got_serial or 0),
+                )
+                return metadata
+
+    async def get_simple_package_metadata(self, package_name, serial=0):
+        """
+        Fetch the simple page of the project and convert it to the shape of the JSON metadata.
+
+        Only the name and the latest version of the project are known from the page, the rest of
+        the project metadata is fetched lazily for the projects that have new files. The serial
+        is only checked when the index listed one, plain simple indexes don't have serials.
+        """
+        path = f"/simple/{package_name}/"
+        headers = {"Accept": ACCEPT_JSON_PREFERRED, **self.conditional_headers(package_name)}
+
+        async with aclosing(self.get(path, None, headers=headers)) as responses:
+            async for response in responses:
+                if response.status == 304:
+                    self.not_modified.add(package_name)
+                    return None
+                if response.status == 404:
+                    raise PackageNotFound(package_name)
+                response.raise_for_status()
+                url = str(response.url)
+                if response.content_type == PYPI_SIMPLE_V1_JSON:
+                    page = ProjectPage.from_json_data(
+                        await response.json(content_type=None), base_url=url
+                    )
+                else:
+                    page = ProjectPage.from_html(package_name, await response.read(), base_url=url)
+                got_serial = page.last_serial or response.headers.get(PYPI_LAST_SERIAL)
+                got_serial = int(got_serial) if got_serial else None
+                if serial:
+                    await self.check_for_stale_cache(path, serial, got_serial)
+                self.fetched_states[package_name] = (
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    got_serial or 0,
+                )
+                self.simple_pages[package_name] = page
+                releases = simple_page_to_releases(page)
+                return {
+                    "info": {
+                        "name": page.project or package_name,
+                        "version": self.latest_version(releases),
+                    },
+                    "releases": releases,
+                    "last_serial": got_serial or 0,
+                }
+
+    @staticmethod
+    def latest_version(releases):
+        """Get the latest final version of the releases, or the latest pre-release if none."""
+        versions = {}
+        for version in releases:
+            try:
+                versions[parse(version)] = version
+            except InvalidVersion:
+                pass
+        final_versions = [version for version in versions if not version.is_prerelease]
+        if latest := max(final_versions or versions, default=None):
+            return versions[latest]
+        return ""
+
+    async def get_project_info(self, pkg, page):
+        """
+        Get the metadata of the latest version of a project synced from its simple page.
+
+        The core metadata of a file of the latest version is used when the index serves it,
+        otherwise the `info` of the PyPI JSON API is used.
+        """
+        version = pkg.info.get("version")
+        packages = [
+            package
+            for package in page.packages
+            if package.version == version and package.has_metadata
+        ]
+        packages.sort(key=lambda package: package.package_type != "wheel")
+        for package in packages:
+            try:
+                async with aclosing(self.get(package.metadata_url, None)) as responses:
+                    async for response in responses:
+                        response.raise_for_status()
+                        info = parse_core_metadata(await response.read())
+            except (ClientError, ValueError) as e:
+                logger.debug(f"Failed to fetch the core metadata of {package.filename}: {e}")
+                continue
+            return {**pkg.info, **info}
+
+        try:
+            async with aclosing(self.get(f"/pypi/{pkg.name}/json", None)) as responses:
+                async for response in responses:
+                    response.raise_for_status()
+                    info = (await response.json())["info"]
+        except (ClientError, ValueError, KeyError) as e:
+            logger.debug(f"Failed to fetch the JSON metadata of {pkg.name}: {e}")
+            return pkg.info
+        return {**pkg.info, **info}
+
 
 class PulpMirror(Mirror):
     """
@@ -162,17 +483,25 @@ class PulpMirror(Mirror):
         """Initialize Bandersnatch Mirror"""
         super().__init__(master=master, workers=workers)
         self.synced_serial = serial
+        # Mirror.packages_to_sync is a class attribute, don't share it between syncs
+        self.packages_to_sync = {}
         self.python_stage = python_stage
         self.progress_report = progress_report
         self.deferred_download = deferred_download
         self.remote = self.python_stage.remote
+        self.errors = False
+        # Provenance is fetched in the background, sharing one limit for the whole sync
+        self.provenance_semaphore = asyncio.Semaphore(workers)
+        self.provenance_tasks = set()
 
     async def determine_packages_to_sync(self):
         """
         Calling this means that includes wasn't specified,
         so try to get all of the packages from Mirror (hopefully PyPi)
         """
-        number_xmlrpc_attempts = 3
+        # The simple index is used right away when the remote isn't set to use XML-RPC
+        number_xmlrpc_attempts = 3 if self.remote.sync_api == "xmlrpc" else 0
+        changelog = False
         for attempt in range(number_xmlrpc_attempts):
             logger.info("Attempt {} to get package list from {}".format(attempt, self.master.url))
             try:
@@ -188,6 +517,7 @@ class PulpMirror(Mirror):
                     logger.info("Syncing based on changelog.")
                     changed_packages = await self.master.changed_packages(self.synced_serial)
                     self.packages_to_sync.update(changed_packages)
+                    changelog = True
                     self.target_serial = max(
                         [self.synced_serial] + [int(v) for v in self.packages_to_sync.values()]
                     )
@@ -196,110 +526,200 @@ class PulpMirror(Mirror):
                 # Retry if XMLRPC endpoint failed, server might not support it.
                 continue
         else:
-            logger.info("Failed to get package list using XMLRPC, trying parse simple page.")
-            url = urljoin(self.remote.url, "simple/")
-            downloader = self.remote.get_downloader(url=url)
-            result = await downloader.run()
-            with open(result.path) as f:
-                index = IndexPage.from_html(f.read())
-                self.packages_to_sync.update({p: 0 for p in index.projects})
-                self.target_serial = result.headers.get(PYPI_LAST_SERIAL, 0)
+            if number_xmlrpc_attempts:
+                logger.info("Failed to get package list using XMLRPC, trying parse simple page.")
+            with tempfile.TemporaryFile(dir=".") as f:
+                content_type, index_serial = await self.fetch_simple_index(f)
+                f.seek(0)
+                self.packages_to_sync.update(parse_simple_index(f, content_type))
+            self.target_serial = max([index_serial] + list(self.packages_to_sync.values()))
 
         self._filter_packages()
+        self.skip_unchanged_packages()
+        if changelog:
+            self.python_stage.synced_projects = {
+                canonicalize_name(name) for name in self.packages_to_sync
+            }
         if self.target_serial:
             logger.info(f"Trying to reach serial: {self.target_serial}")
         pkg_count = len(self.packages_to_sync)
         logger.info(f"{pkg_count} packages to sync.")
 
+    def skip_unchanged_packages(self):
+        """Don't sync the projects whose serial didn't change since the last sync."""
+        project_states = self.python_stage.project_states
+        for name, serial in list(self.packages_to_sync.items()):
+            normalized = canonicalize_name(name)
+            if serial and (state := project_states.get(normalized)) and state[2] >= int(serial):
+                del self.packages_to_sync[name]
+                self.python_stage.unchanged_projects.add(normalized)
+
+    async def fetch_simple_index(self, f):
+        """
+        Download the simple index of the remote into `f`, preferring the PEP 691 JSON form.
+
+        Returns:
+            tuple: The content type of the index and its serial.
+        """
+        headers = {"Accept": ACCEPT_JSON_PREFERRED}
+        async with aclosing(self.master.get("/simple/", None, headers=headers)) as responses:
+            async for response in responses:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(1024 * 1024):
+                    f.write(chunk)
+                return response.content_type, int(response.headers.get(PYPI_LAST_SERIAL, 0))
+
     async def process_package(self, package):
         """Filters the package and creates content from it"""
-        # Don't save anything if our metadata filters all fail.
         await self.progress_report.aincrement()
-        if not package.filter_metadata(self.filters.filter_metadata_plugins()):
+        if package.name in self.master.not_modified:
+            self.python_stage.unchanged_projects.add(package.name)
             return None
 
-        package.filter_all_releases_files(self.filters.filter_release_file_plugins())
-        package.filter_all_releases(self.filters.filter_release_plugins())
-        await self.create_content(package)
+        page = self.master.simple_pages.pop(package.name, None)
+        # Don't save anything if our metadata filters all fail.
+        if package.filter_metadata(self.filters.filter_metadata_plugins()):
+            package.filter_all_releases_files(self.filters.filter_release_file_plugins())
+            package.filter_all_releases(self.filters.filter_release_plugins())
+            await self.create_content(package, page)
+
+        if state := self.master.fetched_states.pop(package.name, None):
+            self.python_stage.new_project_states[package.name] = state
 
-    async def create_content(self, pkg):
+    async def create_content(self, pkg, page=None):
         """
         Take the filtered package, separate into releases and
         create a Content Unit to put into the pipeline
+
+        Files already present in the repository are not declared again. The simple page of the
+        project is fetched unless the metadata was built from it.
         """
         declared_contents = {}
-        page = await aget_remote_simple_page(pkg.name, self.remote)
-        upstream_pkgs = {pkg.filename: pkg for pkg in page.packages}
-
+        missing_provenances = {}
+        new_files = []
+        present_packages = self.python_stage.present_packages
+        present_content = self.python_stage.present_content
         for version, dists in pkg.releases.items():
             for package in dists:
-                entry = parse_metadata(pkg.info, version, package)
-                url = entry.pop("url")
-                size = package["size"] or None
-                d_artifacts = []
-
-                artifact = Artifact(sha256=entry["sha256"], size=size)
-                package = PythonPackageContent(**entry)
-
-                da = DeclarativeArtifact(
-                    artifact=artifact,
-                    url=url,
-                    relative_path=entry["filename"],
-                    remote=self.remote,
-                    deferred_download=self.deferred_download,
-                )
-                d_artifacts.append(da)
-
-                if upstream_pkg := upstream_pkgs.get(entry["filename"]):
-                    if upstream_pkg.has_metadata:
-                        url = upstream_pkg.metadata_url
-                        md_sha256 = upstream_pkg.metadata_digests.get("sha256")
-                        package.metadata_sha256 = md_sha256
-                        artifact = Artifact(sha256=md_sha256)
-
-                        metadata_artifact = DeclarativeArtifact(
-                            artifact=artifact,
-                            url=url,
-                            relative_path=f"{entry['filename']}.metadata",
-                            remote=self.remote,
-                            deferred_download=self.deferred_download,
-                        )
-                        d_artifacts.append(metadata_artifact)
-
-                dc = DeclarativeContent(content=package, d_artifacts=d_artifacts)
-                declared_contents[entry["filename"]] = dc
-                await self.python_stage.put(dc)
-
-        if pkg.releases and page:
-            if self.remote.provenance:
-                await self.sync_provenance(page, declared_contents)
-
-    async def sync_provenance(self, page, declared_contents):
-        """Sync the provenance for the package"""
-
-        async def _create_provenance(filename, provenance_url):
-            downloader = self.remote.get_downloader(
-                url=provenance_url, silence_errors_for_response_codes={404}
+                sha256 = package.get("digests", {}).get("sha256")
+                if not sha256 or not (present := present_packages.get(bytes.fromhex(sha256))):
+                    new_files.append((version, package))
+                    continue
+                content_pk, provenance_pk = present
+                present_content.add(content_pk)
+                if self.remote.provenance:
+                    if provenance_pk:
+                        present_content.add(provenance_pk)
+                    else:
+                        missing_provenances[package["filename"]] = content_pk
+
+        if not new_files and not missing_provenances:
+            return
+
+        info = pkg.info
+        if page is None:
+            page = await aget_remote_simple_page(pkg.name, self.remote)
+        elif new_files:
+            info = await self.master.get_project_info(pkg, page)
+        upstream_pkgs = {pkg.filename: pkg for pkg in page.packages} if page else {}
+
+        for version, package in new_files:
+            entry = parse_metadata(info, version, package)
+            url = entry.pop("url")
+            size = package["size"] or None
+            d_artifacts = []
+
+            artifact = Artifact(sha256=entry["sha256"], size=size)
+            package = PythonPackageContent(**entry)
+
+            da = DeclarativeArtifact(
+                artifact=artifact,
+                url=url,
+                relative_path=entry["filename"],
+                remote=self.remote,
+                deferred_download=self.deferred_download,
             )
-            try:
-                result = await downloader.run()
-            except FileNotFoundError:
-                pass
-            else:
-                package_content = await declared_contents[filename].resolution()
-                with open(result.path) as f:
-                    provenance = Provenance.model_validate_json(f.read())
-                    prov_content = PackageProvenance(
-                        package=package_content, provenance=provenance.model_dump(mode="json")
+            d_artifacts.append(da)
+
+            if upstream_pkg := upstream_pkgs.get(entry["filename"]):
+                if upstream_pkg.has_metadata:
+                    url = upstream_pkg.metadata_url
+                    md_sha256 = upstream_pkg.metadata_digests.get("sha256")
+                    package.metadata_sha256 = md_sha256
+                    artifact = Artifact(sha256=md_sha256)
+
+                    metadata_artifact = DeclarativeArtifact(
+                        artifact=artifact,
+                        url=url,
+                        relative_path=f"{entry['filename']}.metadata",
+                        remote=self.remote,
+                        deferred_download=self.deferred_download,
                     )
-                    prov_content.set_sha256_hook()
-                    await self.python_stage.put(DeclarativeContent(content=prov_content))
+                    d_artifacts.append(metadata_artifact)
+
+            dc = DeclarativeContent(content=package, d_artifacts=d_artifacts)
+            declared_contents[entry["filename"]] = dc
+            await self.python_stage.put(dc)
+
+        if page and self.remote.provenance:
+            await self.sync_provenance(pkg, page, {**missing_provenances, **declared_contents})
 
-        tasks = []
+    async def sync_provenance(self, pkg, page, declared_contents):
+        """
+        Start fetching the provenance of the package files in the background.
+
+        `declared_contents` maps the filenames to their DeclarativeContent, or to the pk of the
+        package when it is already present in the repository. The number of provenance files
+        being fetched at once is bounded for the whole sync, waiting for a free slot here slows
+        down the package workers when fetching provenance is the bottleneck.
+        """
         for package in page.packages:
             if package.filename in declared_contents and package.provenance_url:
-                tasks.append(_create_provenance(package.filename, package.provenance_url))
-        await asyncio.gather(*tasks)
+                await self.provenance_semaphore.acquire()
+                task = asyncio.create_task(
+                    self.create_provenance(
+                        pkg, package.provenance_url, declared_contents[package.filename]
+                    )
+                )
+                self.provenance_tasks.add(task)
+                task.add_done_callback(self.provenance_tasks.discard)
+
+    async def create_provenance(self, pkg, provenance_url, package):
+        """Fetch the provenance of a package file and put it into the pipeline."""
+        try:
+            try:
+                downloader = self.remote.get_downloader(
+                    url=provenance_url, silence_errors_for_response_codes={404}
+                )
+                result = await downloader.run()
+                with open(result.path, "rb") as f:
+                    provenance = PROVENANCE_ADAPTER.validate_json(f.read())
+            finally:
+                self.provenance_semaphore.release()
+
+            if isinstance(package, DeclarativeContent):
+                package = (await package.resolution()).pk
+            prov_content = PackageProvenance(
+                package_id=package, provenance=provenance.model_dump(mode="json")
+            )
+            prov_content.set_sha256_hook()
+            await self.python_stage.put(DeclarativeContent(content=prov_content))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.on_error(e, package=pkg)
+
+    async def wait_for_provenance(self):
+        """Wait for the provenance still being fetched."""
+        while self.provenance_tasks:
+            await asyncio.gather(*self.provenance_tasks)
+
+    async def cancel_provenance(self):
+        """Cancel the provenance still being fetched and wait for it to stop."""
+        tasks = list(self.provenance_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     def finalize_sync(self, *args, **kwargs):
         """No work to be done currently"""
@@ -307,7 +727,91 @@ class PulpMirror(Mirror):
 
     def on_error(self, exception, **kwargs):
         """
-        TODO
-        This should have some error checking
+        Log the error and remember the failed project.
+
+        A project that failed to sync must not be unassociated when mirroring, and the serial
+        reached by this sync can't be trusted for the next one.
         """
         logger.error("Sync encountered an error: ", exc_info=exception)
+        self.errors = True
+        if package := kwargs.get("package"):
+            self.python_stage.failed_projects.add(package.name)
+            self.python_stage.new_project_states.pop(package.name, None)
+
+
+class PythonDeclarativeVersion(DeclarativeVersion):
+    """
+    A DeclarativeVersion that is able to mirror a subset of the remote's projects.
+
+    A sync based on the changelog only streams the projects that changed upstream, so the
+    unassociation done by the core ContentAssociation stage would remove every other project.
+    Mirroring is handled by the `ProjectContentUnassociation` stage instead.
+    """
+
+    def __init__(self, first_stage, repository, mirror=False, **kwargs):
+        """Initialize the DeclarativeVersion with mirroring turned off in ContentAssociation."""
+        super().__init__(first_stage, repository, mirror=False, **kwargs)
+        self.mirror_projects = mirror
+
+    def pipeline_stages(self, new_version):
+        """Add the ProjectContentUnassociation stage when syncing in mirror mode."""
+        pipeline = super().pipeline_stages(new_version)
+        if self.mirror_projects:
+            pipeline.append(ProjectContentUnassociation(new_version, self.first_stage))
+        return pipeline
+
+
+class ProjectContentUnassociation(Stage):
+    """
+    Unassociate the content of the synced projects that was not declared in the stream.
+
+    When `synced_projects` of the first stage is None every project was synced and all
+    undeclared content is removed, like the core mirror mode does. Projects that failed to sync
+    or that weren't modified upstream are left untouched.
+    """
+
+    def __init__(self, new_version, python_stage):
+        """Initialize the stage."""
+        super().__init__()
+        self.new_version = new_version
+        self.python_stage = python_stage
+
+    async def run(self):
+        """Pass the content through and unassociate the stale content at the end of the stream."""
+        declared = set()
+        async for batch in self.batches():
+            for d_content in batch:
+                declared.add(d_content.content.pk)
+                await self.put(d_content)
+        # Content that was found upstream but not declared because it was already present
+        declared |= self.python_stage.present_content
+
+        async with ProgressReport(
+            message="Un-Associating Content", code="unassociating.content"
+        ) as pb:
+            to_delete = await sync_to_async(self._stale_content)(declared)
+            if to_delete:
+                await sync_to_async(self.new_version.remove_content)(
+                    Content.objects.filter(pk__in=to_delete)
+                )
+                await pb.aincrease_by(len(to_delete))
+
+    def _stale_content(self, declared):
+        """Return the pks of the content in the repository that should be removed."""
+        content = self.new_version.content
+        projects = self.python_stage.synced_projects
+        failed = self.python_stage.failed_projects | self.python_stage.unchanged_projects
+        packages = PythonPackageContent.objects.filter(pk__in=content)
+        provenances = PackageProvenance.objects.filter(pk__in=content)
+        if projects is None:
+            if not failed:
+                return set(content.values_list("pk", flat=True)) - declared
+            packages = packages.exclude(name_normalized__in=failed)
+            provenances = provenances.exclude(package__name_normalized__in=failed)
+        else:
+            projects = projects - failed
+            packages = packages.filter(name_normalized__in=projects)
+            provenances = provenances.filter(package__name_normalized__in=projects)
+        stale = set(packages.values_list("pk", flat=True))
+        stale.update(provenances.values_list("pk", flat=True))
+        return stale - declared
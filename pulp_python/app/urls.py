@@ -2,11 +2,13 @@ from django.conf import settings
 from django.urls import path
 
 from pulp_python.app.pypi.views import (
+    ChangesView,
     SimpleView,
     MetadataView,
     PyPIView,
     UploadView,
     ProvenanceView,
+    XMLRPCView,
 )
 
 if settings.DOMAIN_ENABLED:
@@ -40,5 +42,8 @@ urlpatterns = [
         SimpleView.as_view({"get": "list", "post": "create"}),
         name="simple-detail",
     ),
+    path(PYPI_API_URL + "changes/", ChangesView.as_view({"get": "list"}), name="pypi-changes"),
+    # XML-RPC clients call the index url followed by /pypi, without a trailing slash
+    path(PYPI_API_URL + "pypi", XMLRPCView.as_view({"post": "create"}), name="pypi-xmlrpc"),
     path(PYPI_API_URL, PyPIView.as_view({"get": "retrieve"}), name="pypi-detail"),
 ]
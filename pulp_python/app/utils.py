@@ -1,3 +1,4 @@
+import gzip
 import hashlib
 import logging
 import pkginfo
@@ -6,31 +7,59 @@ import shutil
 import tempfile
 import zipfile
 import json
+import json_stream
+from aiohttp import web
 from aiohttp.client_exceptions import ClientError
+from asgiref.sync import sync_to_async
 from collections import defaultdict
-from datetime import timezone
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import cache, lru_cache
+from itertools import groupby, islice
+from operator import attrgetter
+from types import SimpleNamespace
 from django.conf import settings
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.db.utils import IntegrityError
 from jinja2 import Template
+from lxml import etree
+from markupsafe import escape
 from packaging.utils import canonicalize_name
 from packaging.requirements import Requirement
 from packaging.version import parse, InvalidVersion
 from pypi_simple import ACCEPT_JSON_PREFERRED, ProjectPage
-from pulpcore.plugin.models import Artifact, Remote
+from pulpcore.plugin.models import Artifact, ContentArtifact, Remote, RemoteArtifact
 from pulpcore.plugin.exceptions import TimeoutException
 from pulpcore.plugin.util import get_domain
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 log = logging.getLogger(__name__)
 
 
 PYPI_LAST_SERIAL = "X-PYPI-LAST-SERIAL"
-"""TODO This serial constant is temporary until Python repositories implements serials"""
+"""
+The serial of the indexes whose changes aren't tracked, like pull-through indexes. The serials of
+repository versions are counted from it, so they are above the serial mirrors recorded before.
+"""
 PYPI_SERIAL_CONSTANT = 1000000000
 SUPPORTED_METADATA_VERSIONS = ("1.0", "1.1", "1.2", "2.0", "2.1", "2.2", "2.3", "2.4")
 
 SIMPLE_API_VERSION = "1.1"
 PYPI_SIMPLE_V1_HTML = "application/vnd.pypi.simple.v1+html"
 PYPI_SIMPLE_V1_JSON = "application/vnd.pypi.simple.v1+json"
+SIMPLE_HTML_MEDIA_TYPES = ("text/html", PYPI_SIMPLE_V1_HTML)
+SIMPLE_MEDIA_TYPES = (*SIMPLE_HTML_MEDIA_TYPES, PYPI_SIMPLE_V1_JSON)
+
+# The encodings of the precompressed simple pages, in order of preference
+COMPRESSED_FILE_EXTENSIONS = {"br": ".br", "gzip": ".gz"} if brotli else {"gzip": ".gz"}
+
+content_request_headers = ContextVar("content_request_headers", default=None)
+"""The headers of the request being served by the content app."""
 
 simple_index_template = """<!DOCTYPE html>
 <html>
@@ -91,6 +120,17 @@ DIST_REGEXES = {
     ".exe": re.compile(r"^(?P<name>.+?)-(?P<version>.*?)\.(?P<plat>.+?)(-(?P<pyver>.+?))?\.exe$"),
 }
 
+# The package types of pypi_simple mapped to the packagetype of the PyPI JSON API
+SIMPLE_PACKAGE_TYPES = {
+    "sdist": "sdist",
+    "wheel": "bdist_wheel",
+    "egg": "bdist_egg",
+    "wininst": "bdist_wininst",
+    "msi": "bdist_msi",
+    "rpm": "bdist_rpm",
+    "dumb": "bdist_dumb",
+}
+
 DIST_TYPES = {
     "bdist_wheel": pkginfo.Wheel,
     "bdist_wininst": pkginfo.Distribution,
@@ -99,6 +139,10 @@ DIST_TYPES = {
 }
 
 
+# The multiple-use fields of the core metadata, null in the PyPI JSON API when empty
+CORE_METADATA_LIST_FIELDS = ("dynamic", "license_file", "provides_extras", "requires_dist")
+
+
 def parse_project_metadata(project):
     """
     Create a dictionary of python project metadata.
@@ -198,17 +242,89 @@ def get_project_metadata_from_file(filename):
     metadata = DIST_TYPES[packagetype](filename)
     metadata.metadata_sha256 = compute_metadata_sha256(filename)
     metadata.packagetype = packagetype
-    if packagetype == "sdist":
-        metadata.python_version = "source"
-    else:
-        pyver = ""
-        regex = DIST_REGEXES[extensions[pkg_type_index]]
-        if bdist_name := regex.match(filename):
-            pyver = bdist_name.group("pyver") or ""
-        metadata.python_version = pyver
+    metadata.python_version = get_python_version(filename, packagetype)
     return metadata
 
 
+def get_python_version(filename, packagetype):
+    """
+    Gets the python version of a distribution the way the PyPI JSON API reports it.
+    """
+    if packagetype == "sdist":
+        return "source"
+    for extension, regex in DIST_REGEXES.items():
+        if filename.endswith(extension):
+            if bdist_name := regex.match(filename):
+                return bdist_name.group("pyver") or ""
+    return ""
+
+
+def parse_core_metadata(data):
+    """
+    Parse the core metadata file of a distribution, as served by PEP 658.
+
+    The fields are converted to their shape in the `info` of the PyPI JSON API, for the content
+    synced from the simple API to be the same as the content synced from the JSON API.
+
+    Returns:
+        dictionary: of python project metadata, like the `info` of the PyPI JSON API
+
+    """
+    metadata = pkginfo.Distribution()
+    metadata.parse(data)
+    info = vars(metadata)
+    # The JSON API doesn't serve the metadata version
+    info.pop("metadata_version", None)
+    info["platform"] = ", ".join(info.pop("platforms", None) or [])
+    # The project URLs are "Label, URL" strings, the ones without a label are dropped like PyPI does
+    project_urls = {}
+    for project_url in info.get("project_urls") or []:
+        label, _, url = project_url.partition(",")
+        if url.strip():
+            project_urls[label.strip()] = url.strip()
+    info["project_urls"] = project_urls or None
+    info["classifiers"] = list(info.get("classifiers") or [])
+    for field in CORE_METADATA_LIST_FIELDS:
+        info[field] = list(info.get(field) or []) or None
+    return info
+
+
+def simple_page_to_releases(page):
+    """
+    Build the `releases` of the PyPI JSON API from a simple API project page.
+
+    Files whose version can't be determined from their filename are skipped.
+
+    Args:
+        page (pypi_simple.ProjectPage): The simple page of the project
+
+    Returns:
+        dictionary: of the files of every version of the project
+
+    """
+    releases = defaultdict(list)
+    for package in page.packages:
+        if not package.version:
+            continue
+        packagetype = SIMPLE_PACKAGE_TYPES.get(package.package_type, "")
+        upload_time = package.upload_time
+        releases[package.version].append(
+            {
+                "filename": package.filename,
+                "url": package.url,
+                "digests": package.digests,
+                "packagetype": packagetype,
+                "python_version": get_python_version(package.filename, packagetype),
+                "requires_python": package.requires_python,
+                "size": package.size,
+                "upload_time_iso_8601": upload_time.isoformat() if upload_time else None,
+                "yanked": package.is_yanked,
+                "yanked_reason": package.yanked_reason,
+            }
+        )
+    return dict(releases)
+
+
 def extract_wheel_metadata(filename: str) -> bytes | None:
     """
     Extract the metadata file content from a wheel file.
@@ -328,7 +444,12 @@ def fetch_json_release_metadata(name: str, version: str, remotes: set[Remote]) -
         raise Exception(f"Failed to fetch {url} from any remote.")
 
 
-def python_content_to_json(base_path, content_query, version=None, domain=None):
+def version_serial(number):
+    """Returns the serial of the state of a repository at a version number."""
+    return PYPI_SERIAL_CONSTANT + number
+
+
+def python_content_to_json(base_path, content_query, version=None, domain=None, last_serial=0):
     """
     Converts a QuerySet of PythonPackageContent into the PyPi JSON format
     https://www.python.org/dev/peps/pep-0566/
@@ -338,36 +459,255 @@ def python_content_to_json(base_path, content_query, version=None, domain=None):
         releases: Dict
         urls: Dict
 
+    The content is fetched in one query, with the md5 digests of the packages.
+
     Returns None if version is specified but not found within content_query
     """
-    full_metadata = {"last_serial": 0}  # For now the serial field isn't supported by Pulp
-    latest_content = latest_content_version(content_query, version)
+    full_metadata = {"last_serial": last_serial}
+    contents = list(annotate_md5(content_query).order_by("version_key"))
+    latest_content = latest_content_version(contents, version)
     if not latest_content:
         return None
     full_metadata.update({"info": python_content_to_info(latest_content[0])})
-    full_metadata.update({"releases": python_content_to_releases(content_query, base_path, domain)})
+    full_metadata.update({"releases": python_content_to_releases(contents, base_path, domain)})
     full_metadata.update({"urls": python_content_to_urls(latest_content, base_path, domain)})
     return full_metadata
 
 
-def latest_content_version(content_query, version):
+def python_content_to_json_stream(
+    base_path, content_query, version=None, domain=None, last_serial=0
+):
+    """
+    Streams a QuerySet of PythonPackageContent in the PyPi JSON format, like
+    python_content_to_json.
+
+    The latest content is queried first, the releases are then read from a server-side cursor and
+    serialized one by one instead of being built in memory.
+
+    Returns None if version is specified but not found within content_query
     """
-    Walks through the content QuerySet and finds the instances that is the latest version.
+    if version:
+        key = version_key(version)
+        latest_content = content_query.filter(
+            **({"version_key": key} if key else {"version": version})
+        )
+    else:
+        latest_key = content_query.order_by("-version_key").values("version_key")[:1]
+        latest_content = content_query.filter(version_key=Subquery(latest_key))
+    latest_content = list(annotate_md5(latest_content))
+    if not latest_content:
+        return None
+    metadata = {
+        "last_serial": last_serial,
+        "info": python_content_to_info(latest_content[0]),
+        "urls": python_content_to_urls(latest_content, base_path, domain),
+    }
+    contents = (
+        annotate_md5(content_query)
+        .only(
+            "filename",
+            "sha256",
+            "packagetype",
+            "python_version",
+            "requires_python",
+            "size",
+            "pulp_created",
+            "version",
+        )
+        .order_by("version_key", "version")
+    )
+    releases = python_content_to_release_items(
+        contents.iterator(chunk_size=1000), base_path, domain
+    )
+    return stream_project_json(metadata, releases)
+
+
+def project_index_entry_to_json(base_path, entry, domain=None, last_serial=0, streamed=False):
+    """
+    Converts the project index entry of a project into the PyPi JSON format.
+
+    The info of the latest version and the files of the project are read from the entry, like
+    python_content_to_json does from the content of the project.
+    """
+    files = sorted(
+        (
+            SimpleNamespace(**file, pulp_created=datetime.fromisoformat(file["upload_time"]))
+            for file in entry.files
+        ),
+        key=lambda file: (version_key(file.version), file.version),
+    )
+    latest_key = version_key(entry.latest_version)
+    latest_files = [file for file in files if version_key(file.version) == latest_key]
+    metadata = {
+        "last_serial": last_serial,
+        "info": entry.info,
+        "urls": python_content_to_urls(latest_files, base_path, domain),
+    }
+    if streamed:
+        return stream_project_json(
+            metadata, python_content_to_release_items(files, base_path, domain)
+        )
+    metadata["releases"] = python_content_to_releases(files, base_path, domain)
+    return metadata
+
+
+def stream_project_json(metadata, releases):
+    """
+    Serializes the PyPI JSON metadata of a project, yielding its releases one by one.
+
+    Args:
+        metadata (dict): The metadata of the project, without the releases
+        releases (iterable): The versions of the project with the download information of their
+            files
+    """
+    yield json.dumps(metadata)[:-1]
+    yield ', "releases": {'
+    separator = ""
+    for release, files in releases:
+        yield f"{separator}{json.dumps(release)}: {json.dumps(files)}"
+        separator = ", "
+    yield "}}"
+
+
+class StreamingJSONResponse(web.StreamResponse):
+    """
+    A response of the content app streaming the JSON chunks of a synchronous iterator.
+
+    The iterator can query the database, it is consumed by batches in the thread running the
+    synchronous code of the content app.
+    """
+
+    def __init__(self, chunks, headers=None, batch_size=100):
+        super().__init__(headers=headers)
+        self.content_type = "application/json"
+        self._chunks = chunks
+        self._batch_size = batch_size
+
+    async def prepare(self, request):
+        """Send the headers and then the JSON, the length of the body is unknown."""
+        writer = await super().prepare(request)
+        next_batch = sync_to_async(lambda: "".join(islice(self._chunks, self._batch_size)))
+        while data := await next_batch():
+            await self.write(data.encode())
+        return writer
+
+
+class UncachedArtifactResponse(web.StreamResponse):
+    """
+    A response of the content app sending the file of an artifact, not stored by the content cache.
+
+    The content cache keys its entries on the path of the requests only, this response is used for
+    the pages of the simple API negotiated with the Accept and Accept-Encoding headers.
+    """
+
+    def __init__(self, artifact, headers=None, chunk_size=256 * 1024):
+        super().__init__(headers=headers)
+        self._artifact = artifact
+        self._chunk_size = chunk_size
+
+    async def prepare(self, request):
+        """Send the headers and then the file of the artifact, if requested."""
+        self.content_length = self._artifact.size
+        writer = await super().prepare(request)
+        if request.method == "HEAD":
+            return writer
+        file = self._artifact.file
+        read_chunk = sync_to_async(lambda: file.read(self._chunk_size))
+        try:
+            await sync_to_async(file.open)("rb")
+            while chunk := await read_chunk():
+                await self.write(chunk)
+        finally:
+            await sync_to_async(file.close)()
+        return writer
+
+
+def annotate_md5(content_query):
+    """
+    Annotates a QuerySet of PythonPackageContent with the md5 digest of the packages.
+
+    The digest is the one of the artifact of the package file, or of its remote artifact when the
+    artifact isn't downloaded, it is an empty string when unknown.
+    """
+    package_files = ContentArtifact.objects.filter(content=OuterRef("pk")).exclude(
+        relative_path__endswith=".metadata"
+    )
+    remote_files = RemoteArtifact.objects.filter(
+        content_artifact__content=OuterRef("pk"), md5__isnull=False
+    ).exclude(content_artifact__relative_path__endswith=".metadata")
+    return content_query.annotate(
+        md5=Coalesce(
+            Subquery(package_files.filter(artifact__md5__isnull=False).values("artifact__md5")[:1]),
+            Subquery(remote_files.values("md5")[:1]),
+            Value(""),
+        )
+    )
+
+
+def latest_content_version(contents, version):
+    """
+    Walks through the content and finds the instances that is the latest version.
     If 'version' is specified, the function instead tries to find content instances
     with that version and will return an empty list if nothing is found
+
+    The versions are compared by their persisted version key, they are not parsed.
     """
-    latest_version = version
-    latest_content = []
-    for content in content_query:
-        if version and parse(version) == parse(content.version):
-            latest_content.append(content)
-        elif not latest_version or parse(content.version) > parse(latest_version):
-            latest_content = [content]
-            latest_version = content.version
-        elif parse(content.version) == parse(latest_version):
-            latest_content.append(content)
+    if version:
+        key = version_key(version)
+        # Versions that aren't PEP 440 compliant only match themselves
+        return [c for c in contents if c.version_key == key and (key or c.version == version)]
+    latest_key = max((content.version_key for content in contents), default=None)
+    return [content for content in contents if content.version_key == latest_key]
 
-    return latest_content
+
+# The normalized pre-release letters in the order of the version keys
+PRE_RELEASE_KEYS = {"a": "a", "b": "b", "rc": "c"}
+
+
+def _sortable_int(number):
+    """Encodes a non negative integer in a string sorting like the number."""
+    digits = str(number)
+    return f"{len(digits):02d}{digits}"
+
+
+@lru_cache(maxsize=4096)
+def version_key(version):
+    """
+    Returns a string that sorts like the PEP 440 version, compared byte by byte.
+
+    It follows the ordering of packaging's Version: the epoch, the release without its trailing
+    zeros, then the pre, post and dev releases and the local version. The key is an empty string
+    for versions that can't be parsed, they sort before all others.
+    """
+    try:
+        parsed = parse(version)
+    except (InvalidVersion, TypeError):
+        return ""
+
+    release = list(parsed.release)
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    key = [_sortable_int(parsed.epoch), *map(_sortable_int, release), "."]
+
+    # Development releases of final versions sort before their pre-releases
+    if parsed.pre is None and parsed.post is None and parsed.dev is not None:
+        key.append("0")
+    elif parsed.pre is None:
+        key.append("2")
+    else:
+        letter, number = parsed.pre
+        key.append(f"1{PRE_RELEASE_KEYS[letter]}{_sortable_int(number)}")
+    key.append("0" if parsed.post is None else f"1{_sortable_int(parsed.post)}")
+    key.append("1" if parsed.dev is None else f"0{_sortable_int(parsed.dev)}")
+    if parsed.local is None:
+        key.append("0")
+    else:
+        key.append("1")
+        # Alphanumeric segments sort before numeric ones
+        for segment in parsed.local.split("."):
+            key.append(f"1{_sortable_int(int(segment))}" if segment.isdigit() else f"0{segment}!")
+        key.append(".")
+    return "".join(key)
 
 
 def json_to_dict(data):
@@ -428,7 +768,7 @@ def python_content_to_info(content):
 
 def python_content_to_releases(content_query, base_path, domain=None):
     """
-    Takes a QuerySet of PythonPackageContent and returns a dictionary of releases
+    Takes PythonPackageContent annotated with md5 and returns a dictionary of releases
     with each key being a version and value being a list of content for that version of the package
     """
     releases = defaultdict(lambda: [])
@@ -439,6 +779,15 @@ def python_content_to_releases(content_query, base_path, domain=None):
     return releases
 
 
+def python_content_to_release_items(contents, base_path, domain=None):
+    """
+    Takes PythonPackageContent annotated with md5 and ordered by version, and yields each version
+    with the list of download information of its content
+    """
+    for release, release_contents in groupby(contents, key=attrgetter("version")):
+        yield release, python_content_to_urls(release_contents, base_path, domain)
+
+
 def python_content_to_urls(contents, base_path, domain=None):
     """
     Takes the latest content in contents and returns a list of download information
@@ -448,22 +797,10 @@ def python_content_to_urls(contents, base_path, domain=None):
 
 def python_content_to_download_info(content, base_path, domain=None):
     """
-    Takes in a PythonPackageContent and base path of the distribution to create a dictionary of
-    download information for that content. This dictionary is used by Releases and Urls.
+    Takes in a PythonPackageContent annotated with md5 and base path of the distribution to
+    create a dictionary of download information for that content. This dictionary is used by
+    Releases and Urls.
     """
-
-    def find_artifact():
-        _art = content_artifact.artifact
-        if not _art:
-            from pulpcore.plugin import models
-
-            _art = models.RemoteArtifact.objects.filter(content_artifact=content_artifact).first()
-        return _art
-
-    content_artifact = content.contentartifact_set.exclude(
-        relative_path__endswith=".metadata"
-    ).first()
-    artifact = find_artifact()
     origin = settings.CONTENT_ORIGIN or settings.PYPI_API_HOSTNAME or ""
     origin = origin.strip("/")
     prefix = settings.CONTENT_PATH_PREFIX.strip("/")
@@ -472,7 +809,7 @@ def python_content_to_download_info(content, base_path, domain=None):
     if domain:
         components.insert(2, domain.name)
     url = "/".join(components)
-    md5 = artifact.md5 if artifact and artifact.md5 else ""
+    md5 = content.md5 or ""
     return {
         "comment_text": "",
         "digests": {"md5": md5, "sha256": content.sha256},
@@ -492,9 +829,15 @@ def python_content_to_download_info(content, base_path, domain=None):
     }
 
 
+@cache
+def compiled_template(source, autoescape=False):
+    """Compile a Jinja template once per process."""
+    return Template(source, autoescape=autoescape)
+
+
 def write_simple_index(project_names, streamed=False):
     """Writes the simple index."""
-    simple = Template(simple_index_template)
+    simple = compiled_template(simple_index_template)
     context = {
         "SIMPLE_API_VERSION": SIMPLE_API_VERSION,
         "projects": ((x, canonicalize_name(x)) for x in project_names),
@@ -504,29 +847,67 @@ def write_simple_index(project_names, streamed=False):
 
 def write_simple_detail(project_name, project_packages, streamed=False):
     """Writes the simple detail page of a package."""
-    detail = Template(simple_detail_template, autoescape=True)
+    if not streamed:
+        return render_simple_detail(project_name, project_packages)
+    detail = compiled_template(simple_detail_template, autoescape=True)
     context = {
         "SIMPLE_API_VERSION": SIMPLE_API_VERSION,
         "project_name": project_name,
         "project_packages": project_packages,
     }
-    return detail.stream(**context) if streamed else detail.render(**context)
+    return detail.stream(**context)
 
 
-def write_simple_index_json(project_names):
-    """Writes the simple index in JSON format."""
+def render_simple_detail(project_name, project_packages):
+    """
+    Render the simple detail page of a package without Jinja.
+
+    The output is the same as rendering `simple_detail_template`.
+    """
+    name = escape(project_name)
+    parts = [
+        "<!DOCTYPE html>\n<html>\n  <head>\n"
+        f"    <title>Links for {name}</title>\n"
+        f'    <meta name="pypi:repository-version" content="{escape(SIMPLE_API_VERSION)}">\n'
+        f"  </head>\n  <body>\n    <h1>Links for {name}</h1>"
+    ]
+    for pkg in project_packages:
+        link = (
+            f'\n      <a href="{escape(pkg.get("url", ""))}#sha256={escape(pkg.get("sha256", ""))}"'
+        )
+        link += ' rel="internal"'
+        if requires_python := pkg.get("requires_python"):
+            link += f' data-requires-python="{escape(requires_python)}"'
+        if metadata_sha256 := escape(pkg.get("metadata_sha256") or ""):
+            link += f' data-dist-info-metadata="sha256={metadata_sha256}"'
+            link += f' data-core-metadata="sha256={metadata_sha256}"'
+        link += " "
+        if provenance := pkg.get("provenance"):
+            link += f'data-provenance="{escape(provenance)}"'
+        link += f'>{escape(pkg.get("filename", ""))}</a><br/>'
+        parts.append(link)
+    parts.append("\n  </body>\n</html>")
+    return "".join(parts)
+
+
+def write_simple_index_json(projects, last_serial=PYPI_SERIAL_CONSTANT):
+    """
+    Writes the simple index in JSON format.
+
+    Args:
+        projects: The names of the projects with the serial of their last change
+        last_serial: The serial of the index
+    """
     return {
-        "meta": {"api-version": SIMPLE_API_VERSION, "_last-serial": PYPI_SERIAL_CONSTANT},
-        "projects": [
-            {"name": name, "_last-serial": PYPI_SERIAL_CONSTANT} for name in project_names
-        ],
+        "meta": {"api-version": SIMPLE_API_VERSION, "_last-serial": last_serial},
+        "projects": [{"name": name, "_last-serial": serial} for name, serial in projects],
     }
 
 
-def write_simple_detail_json(project_name, project_packages):
+def write_simple_detail_json(project_name, project_packages, last_serial=PYPI_SERIAL_CONSTANT):
     """Writes the simple detail page in JSON format."""
     return {
-        "meta": {"api-version": SIMPLE_API_VERSION, "_last-serial": PYPI_SERIAL_CONSTANT},
+        "meta": {"api-version": SIMPLE_API_VERSION, "_last-serial": last_serial},
         "name": canonicalize_name(project_name),
         "files": [
             {
@@ -553,7 +934,10 @@ def write_simple_detail_json(project_name, project_packages):
             for package in project_packages
         ],
         # (v1.1, PEP 700)
-        "versions": sorted(set(package["version"] for package in project_packages)),
+        "versions": sorted(
+            set(package["version"] for package in project_packages),
+            key=lambda version: (version_key(version), version),
+        ),
         # TODO in the future:
         # alternate-locations (v1.2, PEP 708)
         # project-status (v1.4, PEP 792 - pypi and docs differ)
@@ -569,6 +953,72 @@ def format_upload_time(upload_time):
     return None
 
 
+def parse_accept_header(header):
+    """Parses an Accept or Accept-Encoding header into a dict of its values and quality."""
+    qualities = {}
+    for value in header.split(","):
+        value, *params = (part.strip() for part in value.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, param_value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        if value:
+            qualities[value.lower()] = quality
+    return qualities
+
+
+def select_simple_media_type(accept, media_types=SIMPLE_MEDIA_TYPES):
+    """
+    Selects the media type of the simple API pages served for an Accept header.
+
+    The quality values of the header are honoured, ties are broken by the preference of the
+    server for HTML (PEP 691). Returns None when none of the media types is acceptable.
+    """
+    if not accept:
+        return "text/html"
+    qualities = parse_accept_header(accept)
+
+    def quality_of(media_type):
+        major = media_type.split("/")[0]
+        for candidate in (media_type, f"{major}/*", "*/*"):
+            if candidate in qualities:
+                return qualities[candidate]
+        return 0.0
+
+    # max() keeps the first of equal media types, the server preference
+    media_type = max(media_types, key=quality_of)
+    return media_type if quality_of(media_type) > 0 else None
+
+
+def select_content_encoding(accept_encoding):
+    """
+    Selects the encoding of the precompressed pages served for an Accept-Encoding header.
+
+    Returns None when the client doesn't accept any of the encodings the pages are stored in.
+    """
+    if not accept_encoding:
+        return None
+    qualities = parse_accept_header(accept_encoding)
+
+    def quality_of(encoding):
+        return qualities.get(encoding, qualities.get("*", 0.0))
+
+    encoding = max(COMPRESSED_FILE_EXTENSIONS, key=quality_of)
+    return encoding if quality_of(encoding) > 0 else None
+
+
+def compress(data, encoding):
+    """Compresses data with one of the encodings of COMPRESSED_FILE_EXTENSIONS."""
+    if encoding == "br":
+        return brotli.compress(data)
+    # Without a modification time the same page is always compressed to the same artifact
+    return gzip.compress(data, mtime=0)
+
+
 class PackageIncludeFilter:
     """A special class to help filter Package's based on a remote's include/exclude"""
 
@@ -646,11 +1096,45 @@ def get_remote_package_filter(remote):
     return rfilter
 
 
+def parse_simple_index(f, content_type):
+    """
+    Yield the projects listed in a simple index, parsing the file incrementally.
+
+    Args:
+        f (file): The simple index, opened in binary mode.
+        content_type (str): The content type of the simple index, HTML or PEP 691 JSON.
+
+    Yields:
+        tuple: The name of each project in the index and its last serial, 0 if unknown.
+    """
+    if content_type == PYPI_SIMPLE_V1_JSON:
+        for key, value in json_stream.load(f).items():
+            if key == "projects":
+                for project in value:
+                    project = json_stream.to_standard_types(project)
+                    yield project["name"], int(project.get("_last-serial") or 0)
+    else:
+        for _, anchor in etree.iterparse(f, events=("end",), tag="a", html=True):
+            if anchor.text and anchor.text.strip():
+                yield anchor.text.strip(), 0
+            # Free the elements already parsed, the tree would hold the whole index otherwise
+            anchor.clear(keep_tail=False)
+            while anchor.getprevious() is not None:
+                del anchor.getparent()[0]
+
+
+def _add_simple_accept_header(remote):
+    """Make the remote prefer the JSON simple API, without adding the header more than once."""
+    accept = {"Accept": ACCEPT_JSON_PREFERRED}
+    remote.headers = remote.headers or []
+    if accept not in remote.headers:
+        remote.headers.append(accept)
+
+
 def get_remote_simple_page(package, remote, max_retries=1):
     """Gets the simple page for a package from a remote."""
     url = remote.get_remote_artifact_url(f"simple/{package}/")
-    remote.headers = remote.headers or []
-    remote.headers.append({"Accept": ACCEPT_JSON_PREFERRED})
+    _add_simple_accept_header(remote)
     downloader = remote.get_downloader(url=url, max_retries=max_retries)
     try:
         d = downloader.fetch()
@@ -667,8 +1151,7 @@ def get_remote_simple_page(package, remote, max_retries=1):
 async def aget_remote_simple_page(package, remote, max_retries=1):
     """Gets the simple page for a package from a remote."""
     url = remote.get_remote_artifact_url(f"simple/{package}/")
-    remote.headers = remote.headers or []
-    remote.headers.append({"Accept": ACCEPT_JSON_PREFERRED})
+    _add_simple_accept_header(remote)
     downloader = remote.get_downloader(url=url, max_retries=max_retries)
     try:
         d = await downloader.run()
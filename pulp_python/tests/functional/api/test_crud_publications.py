@@ -93,6 +93,29 @@ def test_removed_content_not_published(
     assert proper is True, msgs
 
 
+@pytest.mark.parallel
+def test_unchanged_projects_republished(
+    python_bindings, python_publication_workflow, python_distribution_factory, monitor_task
+):
+    """Ensure the pages of unchanged projects are published again, and outlive the old ones."""
+    repo, _, pub = python_publication_workflow(includes=PYTHON_SM_PROJECT_SPECIFIER)
+
+    contents = python_bindings.ContentPackagesApi.list(
+        repository_version=repo.latest_version_href, filename="aiohttp-3.3.0.tar.gz"
+    )
+    body = {"remove_content_units": [contents.results[0].pulp_href]}
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+    repo, _, pub2 = python_publication_workflow(repository=repo)
+    python_bindings.PublicationsPypiApi.delete(pub.pulp_href)
+    distro = python_distribution_factory(publication=pub2)
+
+    releases = {**PYTHON_SM_FIXTURE_RELEASES}
+    releases["aiohttp"] = ["aiohttp-3.2.1.tar.gz", "aiohttp-3.2.0.tar.gz"]
+    url = urljoin(distro.base_url, "simple/")
+    proper, msgs = ensure_simple(url, releases, sha_digests=PYTHON_SM_FIXTURE_CHECKSUMS)
+    assert proper is True, msgs
+
+
 @pytest.mark.parallel
 def test_new_content_is_published(python_publication_workflow, python_distribution_factory):
     """Ensures added content is published with a new publication."""
@@ -207,6 +207,46 @@ def test_domain_content_replication(
     assert 1 == python_bindings.RemotesPythonApi.list(pulp_domain=replica_domain.name).count
 
 
+@pytest.mark.parallel
+def test_domain_sync_simple_api_metadata(
+    domain_factory,
+    pulpcore_bindings,
+    python_bindings,
+    python_repo_factory,
+    python_remote_factory,
+    monitor_task,
+):
+    """Test that syncing with the simple API creates the same packages as with the JSON API."""
+    # The packages are synced in their own domain not to be deduplicated with each other
+    packages = {}
+    for sync_api in ("xmlrpc", "simple"):
+        domain = domain_factory()
+        remote = python_remote_factory(
+            includes=PYTHON_SM_PROJECT_SPECIFIER, sync_api=sync_api, pulp_domain=domain.name
+        )
+        repo = python_repo_factory(pulp_domain=domain.name)
+        body = {"remote": remote.pulp_href}
+        monitor_task(python_bindings.RepositoriesPythonApi.sync(repo.pulp_href, body).task)
+        content = python_bindings.ContentPackagesApi.list(pulp_domain=domain.name, limit=100)
+        assert content.count == PYTHON_SM_PACKAGE_COUNT
+        packages[sync_api] = {
+            package.filename: {
+                key: value
+                for key, value in package.to_dict().items()
+                if not key.startswith("pulp_") and key not in ("prn", "artifact")
+            }
+            for package in content.results
+        }
+
+        # Content needs to be deleted for the domain to be deleted
+        monitor_task(python_bindings.RepositoriesPythonApi.delete(repo.pulp_href).task)
+        body = {"orphan_protection_time": 0}
+        task = pulpcore_bindings.OrphansCleanupApi.cleanup(body, pulp_domain=domain.name).task
+        monitor_task(task)
+
+    assert packages["simple"] == packages["xmlrpc"]
+
+
 @pytest.fixture
 def shelf_reader_cleanup():
     """Take care of uninstalling shelf-reader before/after the test."""
@@ -116,3 +116,27 @@ def test_pulp2pulp_sync_with_oddities(
     summary3 = python_content_summary(repository_version=repo3.latest_version_href)
     assert summary3.present["python.python"]["count"] > 0
     assert summary.present["python.python"]["count"] == summary3.present["python.python"]["count"]
+
+
+@pytest.mark.parallel
+def test_full_pulp_to_pulp_sync_simple_api(
+    python_bindings,
+    python_repo_with_sync,
+    python_remote_factory,
+    python_distribution_factory,
+    python_content_summary,
+):
+    """Test that Pulp can fully sync from another Pulp instance using only the simple API."""
+    remote = python_remote_factory(includes=PYTHON_MD_PROJECT_SPECIFIER)
+    repo = python_repo_with_sync(remote)
+    distro = python_distribution_factory(repository=repo)
+
+    remote2 = python_remote_factory(includes=[], url=distro.base_url, sync_api="simple")
+    assert remote2.sync_api == "simple"
+    repo2 = python_repo_with_sync(remote2)
+    summary = python_content_summary(repository_version=repo2.latest_version_href)
+    assert summary.present["python.python"]["count"] == PYTHON_MD_PACKAGE_COUNT
+
+    # Syncing again doesn't create a new version
+    repo2 = python_repo_with_sync(remote2, repository=repo2)
+    assert repo2.latest_version_href.endswith("/versions/1/")
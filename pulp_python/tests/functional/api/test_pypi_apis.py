@@ -1,6 +1,7 @@
 import pytest
 import requests
 import subprocess
+import xmlrpc.client
 
 from urllib.parse import urljoin
 
@@ -10,9 +11,12 @@ from pulp_python.tests.functional.constants import (
     PYTHON_MD_PYPI_SUMMARY,
     PYTHON_EGG_FILENAME,
     PYTHON_EGG_SHA256,
+    PYTHON_EGG_URL,
     PYTHON_WHEEL_FILENAME,
     PYTHON_WHEEL_SHA256,
     SHELF_PYTHON_JSON,
+    TWINE_WHEEL_FILENAME,
+    TWINE_WHEEL_URL,
 )
 from pulp_python.tests.functional.utils import ensure_metadata
 
@@ -282,8 +286,7 @@ def test_pypi_last_serial(
     pulp_content_url,
 ):
     """
-    Checks that the endpoint has the header PYPI_LAST_SERIAL and is set
-    TODO when serial field is added to Repo's, check this header against that
+    Checks that the endpoint has the header PYPI_LAST_SERIAL set to the serial of the project.
     """
     remote = python_remote_factory(policy="immediate")
     repo = python_repo_with_sync(remote)
@@ -294,7 +297,100 @@ def test_pypi_last_serial(
     for url in [content_url, pypi_url]:
         response = requests.get(url)
         assert PYPI_LAST_SERIAL in response.headers, url
-        assert response.headers[PYPI_LAST_SERIAL] == str(PYPI_SERIAL_CONSTANT), url
+        assert response.headers[PYPI_LAST_SERIAL] == str(PYPI_SERIAL_CONSTANT + 1), url
+
+
+def test_pypi_xmlrpc_changelog(
+    monitor_task,
+    python_bindings,
+    python_content_factory,
+    python_distribution_factory,
+    python_repo_factory,
+):
+    """Checks that mirrors can find the projects that changed through XML-RPC."""
+    shelf_reader = python_content_factory(PYTHON_EGG_FILENAME, url=PYTHON_EGG_URL)
+    twine = python_content_factory(TWINE_WHEEL_FILENAME, url=TWINE_WHEEL_URL)
+    repo = python_repo_factory()
+    distro = python_distribution_factory(repository=repo)
+    client = xmlrpc.client.ServerProxy(urljoin(distro.base_url, "pypi"))
+
+    body = {"add_content_units": [shelf_reader.pulp_href]}
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+    body = {"add_content_units": [twine.pulp_href]}
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+
+    assert client.changelog_last_serial() == PYPI_SERIAL_CONSTANT + 2
+    assert client.list_packages_with_serial() == {
+        "shelf-reader": PYPI_SERIAL_CONSTANT + 1,
+        "twine": PYPI_SERIAL_CONSTANT + 2,
+    }
+    changelog = client.changelog_since_serial(PYPI_SERIAL_CONSTANT + 1)
+    assert [(name, action, serial) for name, _, _, action, serial in changelog] == [
+        ("twine", "update", PYPI_SERIAL_CONSTANT + 2)
+    ]
+    assert changelog[0][1] == ""
+    assert client.changelog_since_serial(PYPI_SERIAL_CONSTANT + 2) == []
+    for params in ((), ("1",), (True,), (1, 2)):
+        with pytest.raises(xmlrpc.client.Fault) as exc:
+            client.changelog_since_serial(*params)
+        assert exc.value.faultCode == -32602
+
+    body = {"remove_content_units": [shelf_reader.pulp_href]}
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+    changelog = client.changelog_since_serial(PYPI_SERIAL_CONSTANT + 1)
+    assert sorted((name, action, serial) for name, _, _, action, serial in changelog) == [
+        ("shelf-reader", "remove project", PYPI_SERIAL_CONSTANT + 3),
+        ("twine", "update", PYPI_SERIAL_CONSTANT + 2),
+    ]
+
+    # The project headers follow the serial of the last change of the project
+    response = requests.get(urljoin(distro.base_url, "pypi/twine/json/"))
+    assert response.headers[PYPI_LAST_SERIAL] == str(PYPI_SERIAL_CONSTANT + 2)
+    assert response.json()["last_serial"] == PYPI_SERIAL_CONSTANT + 2
+
+
+def test_pypi_changes(
+    monitor_task,
+    python_bindings,
+    python_content_factory,
+    python_distribution_factory,
+    python_repo_factory,
+):
+    """Checks that the projects changed since a serial or a repository version are listed."""
+    shelf_reader = python_content_factory(PYTHON_EGG_FILENAME, url=PYTHON_EGG_URL)
+    twine = python_content_factory(TWINE_WHEEL_FILENAME, url=TWINE_WHEEL_URL)
+    repo = python_repo_factory()
+    distro = python_distribution_factory(repository=repo)
+    url = urljoin(distro.base_url, "changes/")
+
+    for body in (
+        {"add_content_units": [shelf_reader.pulp_href]},
+        {"add_content_units": [twine.pulp_href]},
+        {"remove_content_units": [shelf_reader.pulp_href]},
+    ):
+        monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+
+    response = requests.get(url, params={"since_version": 1})
+    assert response.headers[PYPI_LAST_SERIAL] == str(PYPI_SERIAL_CONSTANT + 3)
+    changes = response.json()
+    assert changes["last_serial"] == PYPI_SERIAL_CONSTANT + 3
+    assert changes["full_list"] is False
+    assert changes["projects"] == [
+        {"name": "twine", "last_serial": PYPI_SERIAL_CONSTANT + 2, "removed": False},
+        {"name": "shelf-reader", "last_serial": PYPI_SERIAL_CONSTANT + 3, "removed": True},
+    ]
+    response = requests.get(url, params={"since": PYPI_SERIAL_CONSTANT + 1})
+    assert response.json() == changes
+
+    response = requests.get(url, params={"since_version": 3})
+    assert response.json()["projects"] == []
+
+    # The changes after a version that doesn't exist can't be known
+    response = requests.get(url, params={"since": 1})
+    assert response.json()["full_list"] is True
+    assert [p["name"] for p in response.json()["projects"]] == ["twine"]
+
+    assert requests.get(url).status_code == 400
 
 
 def assert_pypi_json(package):
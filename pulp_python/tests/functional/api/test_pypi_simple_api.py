@@ -45,7 +45,7 @@ def test_simple_html_index_api(
 
     response = requests.get(url, headers=headers)
     assert response.headers["Content-Type"] == PYPI_SIMPLE_V1_HTML
-    assert response.headers["X-PyPI-Last-Serial"] == str(PYPI_SERIAL_CONSTANT)
+    assert response.headers["X-PyPI-Last-Serial"] == str(PYPI_SERIAL_CONSTANT + 1)
 
     proper, msgs = ensure_simple(
         url, PYTHON_SM_FIXTURE_RELEASES, sha_digests=PYTHON_SM_FIXTURE_CHECKSUMS
@@ -74,7 +74,7 @@ def test_simple_html_detail_api(
 
     response = requests.get(url, headers=headers)
     assert response.headers["Content-Type"] == PYPI_SIMPLE_V1_HTML
-    assert response.headers["X-PyPI-Last-Serial"] == str(PYPI_SERIAL_CONSTANT)
+    assert response.headers["X-PyPI-Last-Serial"] == str(PYPI_SERIAL_CONSTANT + 1)
 
     proper, msgs = ensure_simple(
         urljoin(distro.base_url, "simple/"),
@@ -99,14 +99,14 @@ def test_simple_json_index_api(
 
     response = requests.get(url, headers=headers)
     assert response.headers["Content-Type"] == PYPI_SIMPLE_V1_JSON
-    assert response.headers["X-PyPI-Last-Serial"] == str(PYPI_SERIAL_CONSTANT)
+    assert response.headers["X-PyPI-Last-Serial"] == str(PYPI_SERIAL_CONSTANT + 1)
 
     data = response.json()
-    assert data["meta"] == {"api-version": API_VERSION, "_last-serial": PYPI_SERIAL_CONSTANT}
+    assert data["meta"] == {"api-version": API_VERSION, "_last-serial": PYPI_SERIAL_CONSTANT + 1}
     assert data["projects"]
     for project in data["projects"]:
-        for i in ["_last-serial", "name"]:
-            assert i in project
+        assert project["name"]
+        assert project["_last-serial"] == PYPI_SERIAL_CONSTANT + 1
 
 
 def test_simple_json_detail_api(
@@ -130,10 +130,10 @@ def test_simple_json_detail_api(
 
     response = requests.get(url, headers=headers)
     assert response.headers["Content-Type"] == PYPI_SIMPLE_V1_JSON
-    assert response.headers["X-PyPI-Last-Serial"] == str(PYPI_SERIAL_CONSTANT)
+    assert response.headers["X-PyPI-Last-Serial"] == str(PYPI_SERIAL_CONSTANT + 1)
 
     data = response.json()
-    assert data["meta"] == {"api-version": API_VERSION, "_last-serial": PYPI_SERIAL_CONSTANT}
+    assert data["meta"] == {"api-version": API_VERSION, "_last-serial": PYPI_SERIAL_CONSTANT + 1}
     assert data["name"] == "twine"
     assert data["files"]
     assert data["versions"] == ["5.1.0"]
@@ -163,6 +163,48 @@ def test_simple_json_detail_api(
     assert file_tar["provenance"] is None
 
 
+def test_simple_api_repository_versions(
+    delete_orphans_pre,
+    monitor_task,
+    python_bindings,
+    python_content_factory,
+    python_distribution_factory,
+    python_repo_factory,
+):
+    """Test that the simple pages follow the content of each repository version."""
+    content_1 = python_content_factory(TWINE_WHEEL_FILENAME, url=TWINE_WHEEL_URL)
+    content_2 = python_content_factory(TWINE_EGG_FILENAME, url=TWINE_EGG_URL)
+    body = {"add_content_units": [content_1.pulp_href, content_2.pulp_href]}
+
+    repo = python_repo_factory()
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+    body = {"remove_content_units": [content_2.pulp_href]}
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+
+    latest = python_distribution_factory(repository=repo)
+    version_1 = python_distribution_factory(repository=repo, version="1")
+    headers = {"Accept": PYPI_SIMPLE_V1_JSON}
+
+    for distro, filenames in (
+        (latest, [TWINE_WHEEL_FILENAME]),
+        (version_1, [TWINE_WHEEL_FILENAME, TWINE_EGG_FILENAME]),
+    ):
+        url = urljoin(distro.base_url, "simple/")
+        response = requests.get(url, headers=headers)
+        assert [p["name"] for p in response.json()["projects"]] == ["twine"]
+
+        response = requests.get(f"{url}twine/", headers=headers)
+        files = response.json()["files"]
+        assert sorted(f["filename"] for f in files) == sorted(filenames)
+
+    body = {"remove_content_units": [content_1.pulp_href]}
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+
+    url = urljoin(latest.base_url, "simple/")
+    assert requests.get(url, headers=headers).json()["projects"] == []
+    assert requests.get(f"{url}twine/", headers=headers).status_code == 404
+
+
 @pytest.mark.parallel
 @pytest.mark.parametrize(
     "header, result",
@@ -192,3 +234,159 @@ def test_simple_api_content_headers(
         response = requests.get(url, headers={"Accept": header})
         assert response.status_code == 200
         assert result in response.headers["Content-Type"]
+
+
+@pytest.mark.parallel
+def test_simple_json_publication(
+    monitor_task,
+    python_bindings,
+    python_content_factory,
+    python_distribution_factory,
+    python_publication_factory,
+    python_repo_factory,
+    pulp_content_url,
+):
+    """Test that publications serve the simple pages in JSON to the clients that ask for it."""
+    content_1 = python_content_factory(TWINE_WHEEL_FILENAME, url=TWINE_WHEEL_URL)
+    content_2 = python_content_factory(TWINE_EGG_FILENAME, url=TWINE_EGG_URL)
+    body = {"add_content_units": [content_1.pulp_href, content_2.pulp_href]}
+
+    repo = python_repo_factory()
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+    pub = python_publication_factory(repository=repo)
+    distro = python_distribution_factory(publication=pub)
+    url = f"{pulp_content_url}{distro.base_path}/simple/"
+    headers = {"Accept": f"{PYPI_SIMPLE_V1_JSON}, {PYPI_TEXT_HTML};q=0.1"}
+
+    response = requests.get(url, headers=headers)
+    assert response.headers["Content-Type"] == PYPI_SIMPLE_V1_JSON
+    assert [p["name"] for p in response.json()["projects"]] == ["twine"]
+
+    response = requests.get(f"{url}twine/", headers=headers)
+    assert response.headers["Content-Type"] == PYPI_SIMPLE_V1_JSON
+    data = response.json()
+    assert data["name"] == "twine"
+    assert data["versions"] == ["5.1.0"]
+    assert sorted(f["filename"] for f in data["files"]) == [
+        TWINE_EGG_FILENAME,
+        TWINE_WHEEL_FILENAME,
+    ]
+    file_whl = next(f for f in data["files"] if f["filename"] == TWINE_WHEEL_FILENAME)
+    assert file_whl["url"] == f"../../{TWINE_WHEEL_FILENAME}"
+    assert file_whl["hashes"] == {"sha256": TWINE_WHEEL_SHA256}
+    assert file_whl["core-metadata"] == {"sha256": TWINE_WHEEL_METADATA_SHA256}
+    assert file_whl["size"] == TWINE_WHEEL_SIZE
+
+    # HTML stays the default
+    response = requests.get(f"{url}twine/", headers={"Accept-Encoding": "identity"})
+    assert PYPI_TEXT_HTML in response.headers["Content-Type"]
+    assert response.headers["Vary"] == "Accept, Accept-Encoding"
+    assert TWINE_WHEEL_FILENAME in response.text
+
+
+@pytest.mark.parallel
+def test_simple_compressed_publication(
+    python_remote_factory,
+    python_repo_with_sync,
+    python_distribution_factory,
+    python_publication_factory,
+    pulp_content_url,
+):
+    """Test that publications serve the precompressed simple pages to the clients accepting them."""
+    remote = python_remote_factory(includes=PYTHON_SM_PROJECT_SPECIFIER)
+    repo = python_repo_with_sync(remote)
+    pub = python_publication_factory(repository=repo)
+    distro = python_distribution_factory(publication=pub)
+    url = f"{pulp_content_url}{distro.base_path}/simple/django/"
+
+    for accept in (PYPI_TEXT_HTML, PYPI_SIMPLE_V1_JSON):
+        response = requests.get(url, headers={"Accept": accept, "Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert accept in response.headers["Content-Type"]
+        for filename in PYTHON_SM_FIXTURE_RELEASES["Django"]:
+            assert filename in response.text
+
+    response = requests.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert PYTHON_SM_FIXTURE_RELEASES["Django"][0] in response.text
+
+
+@pytest.mark.parallel
+def test_simple_negotiation_content_cache(
+    python_remote_factory,
+    python_repo_with_sync,
+    python_distribution_factory,
+    python_publication_factory,
+    pulp_content_url,
+    redis_status,
+):
+    """Test that the content cache doesn't serve a page negotiated for another client."""
+    if not redis_status:
+        pytest.xfail("Could not connect to the Redis server")
+
+    remote = python_remote_factory(includes=PYTHON_SM_PROJECT_SPECIFIER)
+    repo = python_repo_with_sync(remote)
+    pub = python_publication_factory(repository=repo)
+    distro = python_distribution_factory(publication=pub)
+    url = f"{pulp_content_url}{distro.base_path}/simple/django/"
+
+    requests_headers = [
+        ({"Accept": PYPI_TEXT_HTML, "Accept-Encoding": "identity"}, PYPI_TEXT_HTML, None),
+        ({"Accept": PYPI_SIMPLE_V1_JSON, "Accept-Encoding": "identity"}, PYPI_SIMPLE_V1_JSON, None),
+        ({"Accept": PYPI_TEXT_HTML, "Accept-Encoding": "gzip"}, PYPI_TEXT_HTML, "gzip"),
+        ({"Accept": PYPI_SIMPLE_V1_JSON, "Accept-Encoding": "gzip"}, PYPI_SIMPLE_V1_JSON, "gzip"),
+    ]
+    # Each page is requested twice for a cached one to be served to the next request
+    for headers, content_type, encoding in requests_headers * 2:
+        response = requests.get(url, headers=headers)
+        assert response.status_code == 200
+        assert content_type in response.headers["Content-Type"]
+        assert response.headers.get("Content-Encoding") == encoding
+        assert response.headers["Vary"] == "Accept, Accept-Encoding"
+        assert "X-PULP-CACHE" not in response.headers
+        assert PYTHON_SM_FIXTURE_RELEASES["Django"][0] in response.text
+
+
+def test_simple_api_conditional_requests(
+    monitor_task,
+    python_bindings,
+    python_content_factory,
+    python_distribution_factory,
+    python_repo_factory,
+):
+    """Test that the pages can be revalidated with their ETag until the repository changes."""
+    content_1 = python_content_factory(TWINE_WHEEL_FILENAME, url=TWINE_WHEEL_URL)
+    content_2 = python_content_factory(TWINE_EGG_FILENAME, url=TWINE_EGG_URL)
+    body = {"add_content_units": [content_1.pulp_href]}
+
+    repo = python_repo_factory()
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+    distro = python_distribution_factory(repository=repo, cache_max_age=60)
+    assert distro.cache_max_age == 60
+    simple_url = urljoin(distro.base_url, "simple/")
+    urls = [simple_url, f"{simple_url}twine/", urljoin(distro.base_url, "pypi/twine/json/")]
+
+    etags = {}
+    for url in urls:
+        response = requests.get(url)
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == "max-age=60"
+        assert response.headers["Last-Modified"]
+        etags[url] = response.headers["ETag"]
+
+        response = requests.get(url, headers={"If-None-Match": etags[url]})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etags[url]
+        assert response.content == b""
+
+    # The representations of a page have different ETags
+    response = requests.get(f"{simple_url}twine/", headers={"Accept": PYPI_SIMPLE_V1_JSON})
+    assert response.headers["ETag"] != etags[f"{simple_url}twine/"]
+
+    body = {"add_content_units": [content_2.pulp_href]}
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+    for url in urls:
+        response = requests.get(url, headers={"If-None-Match": etags[url]})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etags[url]
@@ -1,6 +1,7 @@
 import pytest
 
 from pulp_python.tests.functional.constants import (
+    PYTHON_EGG_FILENAME,
     PYTHON_XS_PACKAGE_COUNT,
     PYTHON_PRERELEASE_TEST_SPECIFIER,
     PYTHON_WITH_PRERELEASE_COUNT,
@@ -357,3 +358,172 @@ def test_package_sync_with_metadata(
     ensure_metadata(
         pulp_content_url, distro.base_path, "pytz-2023.2-py2.py3-none-any.whl", "pytz", "2023.2"
     )
+
+
+@pytest.mark.parallel
+def test_mirror_resync_present_content(
+    python_bindings,
+    python_repo_with_sync,
+    python_remote_factory,
+    python_content_summary,
+    monitor_task,
+):
+    """Test that content already in the repository is kept, and missing content is synced."""
+    remote = python_remote_factory()
+    repo = python_repo_with_sync(remote, mirror=True)
+    content = python_bindings.ContentPackagesApi.list(repository_version=repo.latest_version_href)
+    body = {"remove_content_units": [content.results[0].pulp_href]}
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(repo.pulp_href, body).task)
+
+    repo = python_repo_with_sync(remote, mirror=True, repository=repo)
+    summary = python_content_summary(repository_version=repo.latest_version_href)
+    assert summary.present["python.python"]["count"] == PYTHON_XS_PACKAGE_COUNT
+    assert summary.added["python.python"]["count"] == 1
+    assert summary.removed == {}
+
+
+@pytest.mark.parallel
+def test_sync_provenance_present_packages(
+    python_repo_with_sync, python_remote_factory, python_content_summary
+):
+    """Test that provenance is synced for packages already in the repository."""
+    remote = python_remote_factory(includes=["twine==6.0.0"])
+    repo = python_repo_with_sync(remote)
+
+    remote = python_remote_factory(provenance=True, includes=["twine==6.0.0"])
+    repo = python_repo_with_sync(remote, repository=repo)
+    summary = python_content_summary(repository_version=repo.latest_version_href)
+    assert summary.present["python.python"]["count"] == 2
+    assert summary.added["python.provenance"]["count"] == 2
+    assert "python.python" not in summary.added
+
+
+@pytest.mark.parallel
+def test_sync_immediate_after_on_demand(
+    python_bindings, python_repo_with_sync, python_remote_factory, python_content_summary
+):
+    """Test that an immediate sync downloads the packages synced on demand before."""
+    remote = python_remote_factory(policy="on_demand")
+    repo = python_repo_with_sync(remote)
+    content = python_bindings.ContentPackagesApi.list(repository_version=repo.latest_version_href)
+    assert content.count == PYTHON_XS_PACKAGE_COUNT
+    assert all(package.artifact is None for package in content.results)
+
+    remote = python_remote_factory(policy="immediate")
+    repo = python_repo_with_sync(remote, repository=repo)
+    summary = python_content_summary(repository_version=repo.latest_version_href)
+    assert summary.present["python.python"]["count"] == PYTHON_XS_PACKAGE_COUNT
+    content = python_bindings.ContentPackagesApi.list(repository_version=repo.latest_version_href)
+    assert all(package.artifact is not None for package in content.results)
+
+
+@pytest.mark.parallel
+def test_sync_on_demand_remote_switch(
+    python_bindings,
+    python_repo_with_sync,
+    python_remote_factory,
+    python_distribution_factory,
+    pulp_content_url,
+    http_get,
+    monitor_task,
+):
+    """Test that the packages synced on demand can be downloaded from the new remote."""
+    old_remote = python_remote_factory(policy="on_demand")
+    repo = python_repo_with_sync(old_remote)
+    remote = python_remote_factory(policy="on_demand")
+    repo = python_repo_with_sync(remote, repository=repo)
+    monitor_task(python_bindings.RemotesPythonApi.delete(old_remote.pulp_href).task)
+
+    distro = python_distribution_factory(repository=repo)
+    url = f"{pulp_content_url}{distro.base_path}/{PYTHON_EGG_FILENAME}"
+    assert http_get(url)
+
+
+@pytest.mark.parallel
+def test_resync_no_changes(python_repo_with_sync, python_remote_factory, python_content_summary):
+    """Test that syncing again when nothing changed upstream doesn't create a new version."""
+    remote = python_remote_factory(includes=PYTHON_SM_PROJECT_SPECIFIER)
+    repo = python_repo_with_sync(remote, mirror=True)
+    version_href = repo.latest_version_href
+
+    repo = python_repo_with_sync(remote, mirror=True, repository=repo)
+    assert repo.latest_version_href == version_href
+    summary = python_content_summary(repository_version=repo.latest_version_href)
+    assert summary.present["python.python"]["count"] == PYTHON_SM_PACKAGE_COUNT
+
+
+@pytest.mark.parallel
+def test_resync_upstream_changes(
+    python_bindings,
+    python_repo_with_sync,
+    python_remote_factory,
+    python_distribution_factory,
+    python_content_summary,
+    monitor_task,
+):
+    """Test that syncing again picks up the projects changed upstream since the last sync."""
+    upstream_remote = python_remote_factory(includes=PYTHON_XS_PROJECT_SPECIFIER)
+    upstream = python_repo_with_sync(upstream_remote)
+    distro = python_distribution_factory(repository=upstream)
+
+    remote = python_remote_factory(includes=[], url=distro.base_url)
+    repo = python_repo_with_sync(remote)
+    summary = python_content_summary(repository_version=repo.latest_version_href)
+    assert summary.present["python.python"]["count"] == PYTHON_XS_PACKAGE_COUNT
+
+    # A project is added and a file of another one is removed upstream
+    upstream_remote = python_remote_factory(includes=PYTHON_SM_PROJECT_SPECIFIER)
+    upstream = python_repo_with_sync(upstream_remote, repository=upstream)
+    content = python_bindings.ContentPackagesApi.list(
+        repository_version=upstream.latest_version_href, name="shelf-reader"
+    )
+    body = {"remove_content_units": [content.results[0].pulp_href]}
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(upstream.pulp_href, body).task)
+
+    repo = python_repo_with_sync(remote, repository=repo)
+    summary = python_content_summary(repository_version=repo.latest_version_href)
+    assert summary.added["python.python"]["count"] == PYTHON_SM_PACKAGE_COUNT
+    assert summary.removed == {}
+    assert (
+        summary.present["python.python"]["count"]
+        == PYTHON_XS_PACKAGE_COUNT + PYTHON_SM_PACKAGE_COUNT
+    )
+
+
+@pytest.mark.parallel
+def test_mirror_resync_dropped_project(
+    python_bindings,
+    python_repo_with_sync,
+    python_remote_factory,
+    python_distribution_factory,
+    python_content_summary,
+    monitor_task,
+):
+    """Test that mirroring again removes the content of the projects dropped upstream."""
+    upstream_remote = python_remote_factory(includes=PYTHON_MD_PROJECT_SPECIFIER)
+    upstream = python_repo_with_sync(upstream_remote)
+    distro = python_distribution_factory(repository=upstream)
+
+    remote = python_remote_factory(includes=[], url=distro.base_url)
+    repo = python_repo_with_sync(remote, mirror=True)
+    summary = python_content_summary(repository_version=repo.latest_version_href)
+    assert summary.present["python.python"]["count"] == PYTHON_MD_PACKAGE_COUNT
+
+    content = python_bindings.ContentPackagesApi.list(
+        repository_version=upstream.latest_version_href, name="shelf-reader"
+    )
+    body = {"remove_content_units": [package.pulp_href for package in content.results]}
+    monitor_task(python_bindings.RepositoriesPythonApi.modify(upstream.pulp_href, body).task)
+
+    repo = python_repo_with_sync(remote, mirror=True, repository=repo)
+    summary = python_content_summary(repository_version=repo.latest_version_href)
+    assert summary.removed["python.python"]["count"] == PYTHON_XS_PACKAGE_COUNT
+    assert "python.python" not in summary.added
+    assert (
+        summary.present["python.python"]["count"]
+        == PYTHON_MD_PACKAGE_COUNT - PYTHON_XS_PACKAGE_COUNT
+    )
+    content = python_bindings.ContentPackagesApi.list(
+        repository_version=repo.latest_version_href, name="shelf-reader"
+    )
+    assert content.count == 0
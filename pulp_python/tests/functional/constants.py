@@ -371,7 +371,7 @@ SHELF_0DOT1_RELEASE = [SHELF_BDIST_PYTHON_DOWNLOAD, SHELF_SDIST_PYTHON_DOWNLOAD]
 
 SHELF_PYTHON_JSON = {
     "info": PYTHON_INFO_DATA,
-    "last_serial": 0,
+    "last_serial": 1000000001,  # The serial of the first repository version
     "releases": {"0.1": SHELF_0DOT1_RELEASE},
     "urls": SHELF_0DOT1_RELEASE,
 }
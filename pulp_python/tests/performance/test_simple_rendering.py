@@ -0,0 +1,45 @@
+import timeit
+
+from jinja2 import Template
+
+from pulp_python.app.utils import (
+    SIMPLE_API_VERSION,
+    compiled_template,
+    render_simple_detail,
+    simple_detail_template,
+)
+
+
+def test_simple_detail_rendering():
+    """Compare the rendering time of the simple detail page with Jinja and without it."""
+    packages = [
+        {
+            "filename": f"package-{i}.0-py3-none-any.whl",
+            "url": f"../../package-{i}.0-py3-none-any.whl",
+            "sha256": "a" * 64,
+            "requires_python": ">=3.9",
+            "metadata_sha256": "b" * 64,
+        }
+        for i in range(50)
+    ]
+    context = {
+        "SIMPLE_API_VERSION": SIMPLE_API_VERSION,
+        "project_name": "package",
+        "project_packages": packages,
+    }
+    template = compiled_template(simple_detail_template, autoescape=True)
+
+    renderers = {
+        "template": lambda: Template(simple_detail_template, autoescape=True).render(**context),
+        "compiled template": lambda: template.render(**context),
+        "fast renderer": lambda: render_simple_detail("package", packages),
+    }
+    expected = renderers["template"]()
+    for name, render in renderers.items():
+        assert render() == expected, name
+
+    # The timings are only reported, they depend too much on the machine running the tests
+    for name, render in renderers.items():
+        number = 100 if name == "template" else 1000
+        timing = min(timeit.repeat(render, number=number, repeat=3)) / number
+        print(f"{name}: {timing * 1000:.3f} ms per page")
@@ -1,5 +1,25 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import chdir
+from pathlib import PurePath
+
+from aiohttp.web import HTTPNotAcceptable
 from django.test import TestCase
 
+from pulp_python.app.models import (
+    PROJECT_INDEX_KEY,
+    SUMMARY_KEY,
+    ProjectIndexEntry,
+    PythonDistribution,
+    PythonPackageContent,
+    PythonPublication,
+    PythonRepository,
+)
+from pulp_python.app.tasks.publish import publish_metadata_files
+from pulp_python.app.tasks.repair import reindex_repositories
+from pulp_python.app.utils import PYPI_SIMPLE_V1_JSON
+
 
 class TestNothing(TestCase):
     """Test Nothing (placeholder)."""
@@ -7,3 +27,118 @@ class TestNothing(TestCase):
     def test_nothing_at_all(self):
         """Test that the tests are running and that's it."""
         self.assertTrue(True)
+
+
+class TestProjectIndex(TestCase):
+    """Test the project index of the repository versions."""
+
+    def setUp(self):
+        self.repository = PythonRepository.objects.create(name="project-index")
+        self.package = PythonPackageContent.objects.create(
+            name="shelf-reader",
+            version="0.1",
+            filename="shelf-reader-0.1.tar.gz",
+            packagetype="sdist",
+            sha256="04cfd8bb4f843e35d51bfdef2035109bdea831b55a57c3e6a154d14be116398c",
+        )
+        with self.repository.new_version() as version:
+            version.add_content(PythonPackageContent.objects.filter(pk=self.package.pk))
+        self.version = version
+
+    def test_no_changes(self):
+        """Test that a version without changes leaves the project index untouched."""
+        # The base version isn't indexed, indexing the new version would rebuild the index
+        del self.version.info[PROJECT_INDEX_KEY]
+        self.version.save(update_fields=["info"])
+        entries = list(ProjectIndexEntry.objects.filter(repository=self.repository).values())
+
+        with self.repository.new_version() as version:
+            version.add_content(PythonPackageContent.objects.filter(pk=self.package.pk))
+
+        self.assertEqual(self.repository.latest_version(), self.version)
+        self.assertEqual(
+            list(ProjectIndexEntry.objects.filter(repository=self.repository).values()), entries
+        )
+        self.version.refresh_from_db()
+        self.assertNotIn(PROJECT_INDEX_KEY, self.version.info)
+
+    def test_changes(self):
+        """Test that the projects changed by a new version are indexed again."""
+        with self.repository.new_version() as version:
+            version.remove_content(PythonPackageContent.objects.filter(pk=self.package.pk))
+
+        version.refresh_from_db()
+        self.assertTrue(version.info[PROJECT_INDEX_KEY])
+        self.assertFalse(ProjectIndexEntry.objects.for_version(version).exists())
+        self.assertTrue(ProjectIndexEntry.objects.for_version(self.version).exists())
+
+    def test_reindex_projects(self):
+        """Test that the projects of a package repaired in place are indexed again."""
+        with self.repository.new_version() as version:
+            version.add_content(
+                PythonPackageContent.objects.filter(
+                    pk=PythonPackageContent.objects.create(
+                        name="aiohttp",
+                        version="3.9.0",
+                        filename="aiohttp-3.9.0.tar.gz",
+                        packagetype="sdist",
+                        sha256="a" * 64,
+                    ).pk
+                )
+            )
+        PythonPackageContent.objects.filter(pk=self.package.pk).update(requires_python=">=3.8")
+
+        reindex_repositories({self.package.pk})
+
+        self.version.refresh_from_db()
+        self.assertNotIn(PROJECT_INDEX_KEY, self.version.info)
+        version.refresh_from_db()
+        self.assertTrue(version.info[PROJECT_INDEX_KEY])
+        self.assertEqual(version.info[SUMMARY_KEY]["files"], 2)
+        entry = ProjectIndexEntry.objects.for_version(version).get(name_normalized="shelf-reader")
+        self.assertEqual(entry.files[0]["requires_python"], ">=3.8")
+
+
+class TestSimplePageNegotiation(TestCase):
+    """Test the variants of the simple pages served by the content app."""
+
+    def setUp(self):
+        repository = PythonRepository.objects.create(name="simple-page-negotiation")
+        # A publication created before the JSON pages were published
+        with tempfile.TemporaryDirectory() as working_dir, chdir(working_dir):
+            os.mkdir("simple")
+            with open("simple/index.html", "w") as f:
+                f.write("<!DOCTYPE html>\n<html><body></body></html>")
+            with PythonPublication.create(repository.latest_version()) as publication:
+                with ThreadPoolExecutor(max_workers=1) as pool:
+                    publish_metadata_files(publication, ["simple/index.html"], pool)
+        self.publication = publication
+
+    def serve(self, accept):
+        """Serve the simple index page to a client sending an Accept header."""
+        return PythonDistribution._serve_simple_page(
+            self.publication, PurePath("simple"), accept, PYPI_SIMPLE_V1_JSON, None
+        )
+
+    def test_html_fallback(self):
+        """Test that the HTML page is served to the JSON clients accepting HTML too."""
+        response = self.serve(f"{PYPI_SIMPLE_V1_JSON}, text/html;q=0.01")
+        self.assertEqual(response.headers["Content-Type"], "text/html")
+        self.assertEqual(response.headers["Vary"], "Accept, Accept-Encoding")
+
+    def test_not_acceptable(self):
+        """Test that the clients only accepting JSON get a 406 response."""
+        with self.assertRaises(HTTPNotAcceptable):
+            self.serve(PYPI_SIMPLE_V1_JSON)
+
+    def test_vary(self):
+        """Test that the simple pages served as published files vary on the negotiated headers."""
+        distribution = PythonDistribution(name="simple-page-negotiation")
+        for path, vary in (
+            ("simple/index.html", True),
+            ("simple/shelf-reader/index.html", True),
+            ("simple/shelf-reader/index.json", False),
+            ("shelf-reader-0.1.tar.gz", False),
+        ):
+            with self.subTest(path=path):
+                self.assertEqual("Vary" in distribution.content_headers_for(path), vary)
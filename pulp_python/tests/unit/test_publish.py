@@ -0,0 +1,102 @@
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import chdir
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from pulpcore.plugin.models import PublishedArtifact
+
+from pulp_python.app.models import PythonPackageContent, PythonPublication, PythonRepository
+from pulp_python.app.tasks.publish import publish_metadata_files, write_simple_api
+
+
+class TestPublishMetadataFiles(TestCase):
+    """Test the publication of the metadata files."""
+
+    page = "<!DOCTYPE html>\n<html><body><a href='shelf-reader/'>shelf-reader</a></body></html>"
+
+    def publish(self):
+        """Publish the page in a new publication, returns the artifact it is published with."""
+        repository = PythonRepository.objects.create(name=str(uuid.uuid4()))
+        with tempfile.TemporaryDirectory() as working_dir, chdir(working_dir):
+            os.mkdir("simple")
+            with open("simple/index.html", "w") as f:
+                f.write(self.page)
+            with PythonPublication.create(repository.latest_version()) as publication:
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    publish_metadata_files(publication, ["simple/index.html"], pool)
+        return (
+            PublishedArtifact.objects.select_related("content_artifact__artifact")
+            .get(publication=publication, relative_path="simple/index.html")
+            .content_artifact.artifact
+        )
+
+    def assertStored(self, artifact):
+        """Assert that the file of the artifact is in the storage with the content of the page."""
+        self.assertTrue(artifact.file.storage.exists(artifact.file.name))
+        with artifact.file.open() as f:
+            self.assertEqual(f.read().decode(), self.page)
+
+    def test_reused_artifact(self):
+        """Test that the artifact of a file with the same content is reused."""
+        artifact = self.publish()
+        self.assertStored(artifact)
+        self.assertEqual(self.publish(), artifact)
+
+    def test_missing_file(self):
+        """Test that the file of a reused artifact is stored again if it is missing."""
+        artifact = self.publish()
+        artifact.file.storage.delete(artifact.file.name)
+
+        self.assertEqual(self.publish(), artifact)
+        artifact.refresh_from_db()
+        self.assertStored(artifact)
+
+
+class TestParallelPublish(TestCase):
+    """Test the rendering of the project pages by a pool of processes."""
+
+    def setUp(self):
+        self.packages = [
+            PythonPackageContent.objects.create(
+                name=f"project-{i}",
+                version=version,
+                filename=f"project-{i}-{version}.tar.gz",
+                packagetype="sdist",
+                sha256=f"{i:032x}{j:032x}",
+                requires_python=">=3.8",
+            )
+            for i in range(5)
+            for j, version in enumerate(("0.9", "0.10"))
+        ]
+
+    def publish(self):
+        """Publish the packages in a new repository, returns the digests of the published files."""
+        repository = PythonRepository.objects.create(name=str(uuid.uuid4()))
+        with repository.new_version() as version:
+            version.add_content(
+                PythonPackageContent.objects.filter(pk__in=[p.pk for p in self.packages])
+            )
+        with tempfile.TemporaryDirectory() as working_dir, chdir(working_dir):
+            with PythonPublication.create(version) as publication:
+                write_simple_api(publication)
+        return dict(
+            PublishedArtifact.objects.filter(publication=publication).values_list(
+                "relative_path", "content_artifact__artifact__sha256"
+            )
+        )
+
+    def test_same_as_single_process(self):
+        """Test that the pages rendered by the workers are the ones of a single process."""
+        with override_settings(PYTHON_PUBLISH_WORKERS=0):
+            published = self.publish()
+        # Several shards for each of the workers
+        with (
+            override_settings(PYTHON_PUBLISH_WORKERS=2),
+            patch.dict(write_simple_api.__globals__, PUBLISH_BATCH_SIZE=2),
+        ):
+            self.assertEqual(self.publish(), published)
+        self.assertIn("simple/project-4/index.json", published)
+        self.assertEqual(len(published), 2 + 5 * 2)
@@ -0,0 +1,158 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from django.test import TestCase
+
+from pulp_python.app.models import ProjectSyncState, PythonRemote, PythonRepository
+from pulp_python.app.tasks.sync import PulpMaster, PulpMirror, save_sync_state
+from pulp_python.app.utils import PYPI_LAST_SERIAL
+
+
+class TestPulpMaster(TestCase):
+    """Test the conditional requests made for the metadata of the projects."""
+
+    etag = '"shelf-reader-2"'
+    metadata = {"info": {"name": "shelf-reader", "version": "0.1"}, "releases": {}}
+
+    async def handler(self, request):
+        """Serve the metadata of the project, validated by its current ETag."""
+        self.requests.append(request.headers.get("If-None-Match"))
+        headers = {"ETag": self.etag, PYPI_LAST_SERIAL: "5"}
+        if request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304, headers=headers)
+        return web.json_response(self.metadata, headers=headers)
+
+    def get_package_metadata(self, project_states):
+        """Fetch the metadata of the project with the project states of the last sync."""
+        self.requests = []
+
+        async def fetch():
+            app = web.Application()
+            app.router.add_get("/pypi/shelf-reader/json", self.handler)
+            async with TestServer(app) as server:
+                url = str(server.make_url("")).rstrip("/")
+                async with PulpMaster(url, project_states, allow_non_https=True) as master:
+                    metadata = await master.get_package_metadata("shelf-reader")
+            return master, metadata
+
+        return asyncio.run(fetch())
+
+    def test_not_modified(self):
+        """Test that a project not modified since the last sync isn't fetched again."""
+        master, metadata = self.get_package_metadata({"shelf-reader": (self.etag, None, 3)})
+        self.assertEqual(self.requests, [self.etag])
+        self.assertIsNone(metadata)
+        self.assertEqual(master.not_modified, {"shelf-reader"})
+        self.assertEqual(master.fetched_states, {})
+
+    def test_modified(self):
+        """Test that a project whose ETag changed since the last sync is fetched again."""
+        master, metadata = self.get_package_metadata(
+            {"shelf-reader": ('"shelf-reader-1"', None, 3)}
+        )
+        self.assertEqual(self.requests, ['"shelf-reader-1"'])
+        self.assertEqual(metadata, self.metadata)
+        self.assertEqual(master.not_modified, set())
+        self.assertEqual(master.fetched_states, {"shelf-reader": (self.etag, None, 5)})
+
+    def test_first_sync(self):
+        """Test that the projects unknown to the last sync are fetched unconditionally."""
+        master, metadata = self.get_package_metadata({})
+        self.assertEqual(self.requests, [None])
+        self.assertEqual(metadata, self.metadata)
+        self.assertEqual(master.fetched_states, {"shelf-reader": (self.etag, None, 5)})
+
+
+class TestSaveSyncState(TestCase):
+    """Test the project states recorded by the syncs."""
+
+    def setUp(self):
+        self.repository = PythonRepository.objects.create(name="sync-state")
+        self.remote = PythonRemote.objects.create(name="sync-state", url="https://example.com")
+        ProjectSyncState.objects.create(
+            repository=self.repository,
+            remote=self.remote,
+            name="shelf-reader",
+            etag='"shelf-reader-1"',
+            serial=3,
+        )
+
+    def get_states(self):
+        """Get the project states recorded for the repository."""
+        return {
+            state.name: (state.etag, state.last_modified, state.serial)
+            for state in ProjectSyncState.objects.filter(repository=self.repository)
+        }
+
+    def save_sync_state(self, new_project_states, incremental):
+        """Record the project states fetched by a sync."""
+        first_stage = SimpleNamespace(new_project_states=new_project_states, target_serial=0)
+        save_sync_state(self.repository, self.remote, False, first_stage, incremental)
+
+    def test_not_modified(self):
+        """Test that the state of the projects not modified upstream is left untouched."""
+        self.save_sync_state({"aiohttp": ('"aiohttp-1"', None, 4)}, incremental=True)
+        self.assertEqual(
+            self.get_states(),
+            {
+                "shelf-reader": ('"shelf-reader-1"', None, 3),
+                "aiohttp": ('"aiohttp-1"', None, 4),
+            },
+        )
+
+    def test_modified(self):
+        """Test that the state of the projects fetched again is updated."""
+        self.save_sync_state({"shelf-reader": ('"shelf-reader-2"', None, 5)}, incremental=True)
+        self.assertEqual(self.get_states(), {"shelf-reader": ('"shelf-reader-2"', None, 5)})
+
+    def test_not_incremental(self):
+        """Test that the states recorded by a sync that didn't use them are discarded."""
+        self.save_sync_state({"aiohttp": ('"aiohttp-1"', None, 4)}, incremental=False)
+        self.assertEqual(self.get_states(), {"aiohttp": ('"aiohttp-1"', None, 4)})
+
+
+class TestProvenanceTasks(TestCase):
+    """Test the provenance fetched in the background by a sync with provenance enabled."""
+
+    def setUp(self):
+        python_stage = SimpleNamespace(remote=SimpleNamespace(provenance=True))
+        self.mirror = PulpMirror(0, None, 2, True, python_stage, None)
+
+    def start(self, coroutine):
+        """Start fetching provenance in the background like `PulpMirror.sync_provenance`."""
+        task = asyncio.create_task(coroutine)
+        self.mirror.provenance_tasks.add(task)
+        task.add_done_callback(self.mirror.provenance_tasks.discard)
+        return task
+
+    def test_wait_for_provenance(self):
+        """Test that the provenance started while waiting is waited for too."""
+        fetched = []
+
+        async def fetch(filename, then=None):
+            await asyncio.sleep(0)
+            fetched.append(filename)
+            if then:
+                self.start(fetch(then))
+
+        async def run():
+            self.start(fetch("shelf-reader-0.1.tar.gz", then="shelf_reader-0.1-py2-none-any.whl"))
+            await self.mirror.wait_for_provenance()
+
+        asyncio.run(run())
+        self.assertEqual(fetched, ["shelf-reader-0.1.tar.gz", "shelf_reader-0.1-py2-none-any.whl"])
+        self.assertEqual(self.mirror.provenance_tasks, set())
+
+    def test_cancel_provenance(self):
+        """Test that the provenance still being fetched when a sync fails is cancelled."""
+
+        async def run():
+            tasks = [self.start(asyncio.sleep(3600)) for _ in range(2)]
+            await self.mirror.cancel_provenance()
+            return tasks
+
+        tasks = asyncio.run(run())
+        self.assertTrue(all(task.cancelled() for task in tasks))
+        self.assertEqual(self.mirror.provenance_tasks, set())
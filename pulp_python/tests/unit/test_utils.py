@@ -0,0 +1,434 @@
+import io
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from jinja2 import Template
+from packaging.version import Version
+from pypi_simple import ProjectPage
+from pulpcore.plugin.models import ContentArtifact, RemoteArtifact
+
+from pulp_python.app.models import (
+    ProjectIndexEntry,
+    PythonPackageContent,
+    PythonRemote,
+    PythonRepository,
+)
+from pulp_python.app.utils import (
+    COMPRESSED_FILE_EXTENSIONS,
+    PYPI_SIMPLE_V1_HTML,
+    PYPI_SIMPLE_V1_JSON,
+    SIMPLE_API_VERSION,
+    parse_core_metadata,
+    parse_metadata,
+    parse_simple_index,
+    project_index_entry_to_json,
+    python_content_to_json,
+    python_content_to_json_stream,
+    select_content_encoding,
+    select_simple_media_type,
+    simple_detail_template,
+    simple_page_to_releases,
+    version_key,
+    write_simple_detail,
+    write_simple_detail_json,
+)
+
+
+class TestWriteSimpleDetail(TestCase):
+    """Test the rendering of the simple detail page."""
+
+    def render_template(self, project_name, project_packages):
+        """Render the detail page with Jinja."""
+        return Template(simple_detail_template, autoescape=True).render(
+            SIMPLE_API_VERSION=SIMPLE_API_VERSION,
+            project_name=project_name,
+            project_packages=project_packages,
+        )
+
+    def test_same_as_template(self):
+        """Test that the fast renderer has the same output as the Jinja template."""
+        packages = [
+            {
+                "filename": "shelf-reader-0.1.tar.gz",
+                "url": "../../shelf-reader-0.1.tar.gz",
+                "sha256": "04cfd8bb4f843e35d51bfdef2035109bdea831b55a57c3e6a154d14be116398c",
+            },
+            {
+                "filename": "shelf_reader-0.1-py2-none-any.whl",
+                "url": "https://example.com/shelf_reader-0.1-py2-none-any.whl?a=1&b=2",
+                "sha256": "2eceb1643c10c5e4a65970baf63bde43b79cbdac7de81dae853ce47ab05197e9",
+                "requires_python": ">=3.8, <4",
+                "metadata_sha256": "a" * 64,
+                "provenance": "https://example.com/provenance/",
+            },
+            {"filename": "<b>", "url": None, "sha256": "", "requires_python": ""},
+        ]
+        for project_name, project_packages in (
+            ("shelf-reader", packages),
+            ("shelf-reader", packages[1:]),
+            ("a&b", []),
+        ):
+            with self.subTest(project_name=project_name, packages=len(project_packages)):
+                self.assertEqual(
+                    write_simple_detail(project_name, project_packages),
+                    self.render_template(project_name, project_packages),
+                )
+                self.assertEqual(
+                    "".join(write_simple_detail(project_name, project_packages, streamed=True)),
+                    self.render_template(project_name, project_packages),
+                )
+
+    def test_json_versions(self):
+        """Test that the versions of the JSON page are ordered by version, not as strings."""
+        packages = [
+            {
+                "filename": f"shelf-reader-{version}.tar.gz",
+                "url": f"../../shelf-reader-{version}.tar.gz",
+                "sha256": "",
+                "version": version,
+                "requires_python": None,
+                "metadata_sha256": None,
+                "size": 0,
+                "upload_time": None,
+            }
+            for version in ("0.10", "0.9", "0.10rc1", "0.9")
+        ]
+        data = write_simple_detail_json("shelf-reader", packages)
+        self.assertEqual(data["versions"], ["0.9", "0.10rc1", "0.10"])
+
+
+class TestContentNegotiation(TestCase):
+    """Test the negotiation of the simple pages served by the content app."""
+
+    def test_select_simple_media_type(self):
+        """Test that the quality values are honoured and HTML is preferred on ties."""
+        for accept, media_type in (
+            (None, "text/html"),
+            ("*/*", "text/html"),
+            ("application/*", PYPI_SIMPLE_V1_HTML),
+            (PYPI_SIMPLE_V1_JSON, PYPI_SIMPLE_V1_JSON),
+            (f"{PYPI_SIMPLE_V1_JSON}, {PYPI_SIMPLE_V1_HTML}", PYPI_SIMPLE_V1_HTML),
+            (
+                f"{PYPI_SIMPLE_V1_JSON}, {PYPI_SIMPLE_V1_HTML};q=0.2, text/html;q=0.01",
+                PYPI_SIMPLE_V1_JSON,
+            ),
+            ("text/html;q=0", None),
+            ("image/png", None),
+        ):
+            with self.subTest(accept=accept):
+                self.assertEqual(select_simple_media_type(accept), media_type)
+
+    def test_select_content_encoding(self):
+        """Test that only the encodings the pages are compressed in are selected."""
+        preferred = next(iter(COMPRESSED_FILE_EXTENSIONS))
+        for accept_encoding, encoding in (
+            (None, None),
+            ("identity", None),
+            ("gzip, deflate", "gzip"),
+            ("*", preferred),
+            ("gzip;q=0", None),
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(select_content_encoding(accept_encoding), encoding)
+
+
+class TestParseSimpleIndex(TestCase):
+    """Test the parsing of the simple indexes of the remotes."""
+
+    def test_html(self):
+        """Test that the projects are read from the anchors of an HTML index."""
+        anchors = "".join(f'<a href="/simple/project-{i}/">project-{i}</a>\n' for i in range(1000))
+        index = (
+            "<!DOCTYPE html>\n<html><head><title>Simple index</title></head><body>\n"
+            f'{anchors}<a href="/simple/shelf-reader/"> shelf-reader </a>\n'
+            '<a href="/simple/empty/"></a>\n</body></html>'
+        )
+        projects = list(parse_simple_index(io.BytesIO(index.encode()), PYPI_SIMPLE_V1_HTML))
+        self.assertEqual(len(projects), 1001)
+        self.assertEqual(projects[0], ("project-0", 0))
+        self.assertEqual(projects[-1], ("shelf-reader", 0))
+
+    def test_json(self):
+        """Test that the projects and their last serial are read from a PEP 691 JSON index."""
+        index = {
+            "meta": {"api-version": "1.1", "_last-serial": 20},
+            "projects": [{"name": "aiohttp", "_last-serial": 12}, {"name": "shelf-reader"}],
+        }
+        projects = parse_simple_index(io.BytesIO(json.dumps(index).encode()), PYPI_SIMPLE_V1_JSON)
+        self.assertEqual(list(projects), [("aiohttp", 12), ("shelf-reader", 0)])
+
+
+class TestSimplePageToReleases(TestCase):
+    """Test the releases of the PyPI JSON API built from the simple pages of the remotes."""
+
+    base_url = "https://example.com/simple/shelf-reader/"
+    sdist = "shelf-reader-0.1.tar.gz"
+    wheel = "shelf_reader-0.1-py2-none-any.whl"
+    sha256 = "04cfd8bb4f843e35d51bfdef2035109bdea831b55a57c3e6a154d14be116398c"
+
+    def test_json(self):
+        """Test the releases built from a PEP 691 JSON page."""
+        data = {
+            "meta": {"api-version": "1.1"},
+            "name": "shelf-reader",
+            "versions": ["0.1"],
+            "files": [
+                {
+                    "filename": self.sdist,
+                    "url": f"https://files.example.com/{self.sdist}",
+                    "hashes": {"sha256": self.sha256},
+                    "requires-python": ">=3.8",
+                    "size": 19097,
+                    "upload-time": "2014-11-13T14:46:53.000000Z",
+                },
+                {
+                    "filename": self.wheel,
+                    "url": f"https://files.example.com/{self.wheel}",
+                    "hashes": {},
+                    "yanked": "broken",
+                },
+                {
+                    "filename": "notes.txt",
+                    "url": "https://files.example.com/notes.txt",
+                    "hashes": {},
+                },
+            ],
+        }
+        page = ProjectPage.from_json_data(data, base_url=self.base_url)
+        releases = simple_page_to_releases(page)
+        self.assertEqual(list(releases), ["0.1"])
+        sdist, wheel = releases["0.1"]
+        self.assertEqual(
+            sdist,
+            {
+                "filename": self.sdist,
+                "url": f"https://files.example.com/{self.sdist}",
+                "digests": {"sha256": self.sha256},
+                "packagetype": "sdist",
+                "python_version": "source",
+                "requires_python": ">=3.8",
+                "size": 19097,
+                "upload_time_iso_8601": "2014-11-13T14:46:53+00:00",
+                "yanked": False,
+                "yanked_reason": None,
+            },
+        )
+        self.assertEqual(wheel["packagetype"], "bdist_wheel")
+        self.assertEqual(wheel["python_version"], "py2")
+        self.assertIsNone(wheel["upload_time_iso_8601"])
+        self.assertTrue(wheel["yanked"])
+        self.assertEqual(wheel["yanked_reason"], "broken")
+
+    def test_html(self):
+        """Test the releases built from an HTML page."""
+        html = (
+            "<html><body>"
+            f'<a href="https://files.example.com/{self.sdist}#sha256={self.sha256}"'
+            f' data-requires-python="&gt;=3.8">{self.sdist}</a>'
+            f'<a href="https://files.example.com/{self.wheel}" data-yanked="">{self.wheel}</a>'
+            "</body></html>"
+        )
+        page = ProjectPage.from_html("shelf-reader", html, base_url=self.base_url)
+        sdist, wheel = simple_page_to_releases(page)["0.1"]
+        self.assertEqual(sdist["digests"], {"sha256": self.sha256})
+        self.assertEqual(sdist["requires_python"], ">=3.8")
+        self.assertEqual(sdist["packagetype"], "sdist")
+        self.assertIsNone(sdist["size"])
+        self.assertFalse(sdist["yanked"])
+        self.assertEqual(wheel["packagetype"], "bdist_wheel")
+        self.assertTrue(wheel["yanked"])
+
+
+class TestParseCoreMetadata(TestCase):
+    """Test the metadata of the packages synced from the core metadata of the simple API."""
+
+    core_metadata = b"""Metadata-Version: 2.1
+Name: shelf-reader
+Version: 0.1
+Summary: Make sure your collections are in call number order.
+Home-page: https://github.com/asmacdo/shelf-reader
+Author: Austin Macdonald
+Author-email: asmacdo@gmail.com
+License: GNU GENERAL PUBLIC LICENSE Version 2
+Keywords: library,barcode
+Platform: UNKNOWN
+Classifier: Development Status :: 3 - Alpha
+Classifier: Programming Language :: Python :: 2.7
+Requires-Dist: requests>=2.0
+Project-URL: Source, https://github.com/asmacdo/shelf-reader
+Project-URL: Issues, https://github.com/asmacdo/shelf-reader/issues
+Provides-Extra: test
+
+shelf-reader is a tool for libraries.
+"""
+    # The `info` of the PyPI JSON API for the same metadata
+    json_info = {
+        "name": "shelf-reader",
+        "version": "0.1",
+        "summary": "Make sure your collections are in call number order.",
+        "description": "shelf-reader is a tool for libraries.\n",
+        "description_content_type": None,
+        "home_page": "https://github.com/asmacdo/shelf-reader",
+        "download_url": None,
+        "author": "Austin Macdonald",
+        "author_email": "asmacdo@gmail.com",
+        "maintainer": None,
+        "maintainer_email": None,
+        "license": "GNU GENERAL PUBLIC LICENSE Version 2",
+        "keywords": "library,barcode",
+        "platform": "UNKNOWN",
+        "classifiers": [
+            "Development Status :: 3 - Alpha",
+            "Programming Language :: Python :: 2.7",
+        ],
+        "requires_dist": ["requests>=2.0"],
+        "requires_python": None,
+        "project_urls": {
+            "Source": "https://github.com/asmacdo/shelf-reader",
+            "Issues": "https://github.com/asmacdo/shelf-reader/issues",
+        },
+        "provides_extras": ["test"],
+        "dynamic": None,
+        "license_expression": None,
+        "license_file": None,
+        "yanked": False,
+        "yanked_reason": None,
+    }
+    distribution = {
+        "filename": "shelf-reader-0.1.tar.gz",
+        "packagetype": "sdist",
+        "url": "https://files.example.com/shelf-reader-0.1.tar.gz",
+        "digests": {"sha256": "04cfd8bb4f843e35d51bfdef2035109bdea831b55a57c3e6a154d14be116398c"},
+        "python_version": "source",
+        "size": 19097,
+    }
+
+    def test_json_api_shape(self):
+        """Test that the core metadata is converted to the shape of the JSON API."""
+        info = parse_core_metadata(self.core_metadata)
+        self.assertEqual(info["project_urls"], self.json_info["project_urls"])
+        self.assertEqual(info["platform"], "UNKNOWN")
+        self.assertIsNone(info["dynamic"])
+        self.assertNotIn("metadata_version", info)
+
+    def test_same_as_json_api(self):
+        """Test that the content synced from both APIs has the same metadata."""
+        # The simple page of the project only gives its name and latest version
+        simple_info = {"name": "shelf-reader", "version": "0.1"}
+        info = {**simple_info, **parse_core_metadata(self.core_metadata)}
+        from_simple = parse_metadata(info, "0.1", self.distribution)
+        from_json = parse_metadata(self.json_info, "0.1", self.distribution)
+        self.assertEqual(from_simple, from_json)
+        self.assertIsInstance(json.loads(from_simple["project_urls"]), dict)
+
+
+class TestPythonContentToJson(TestCase):
+    """Test the JSON metadata of the projects."""
+
+    def setUp(self):
+        """Create a project of on-demand packages with the md5 of their remote artifacts."""
+        remote = PythonRemote.objects.create(name="shelf-reader", url="https://example.com/")
+        for i in range(20):
+            filename = f"shelf-reader-0.{i}.tar.gz"
+            package = PythonPackageContent.objects.create(
+                name="shelf-reader",
+                version=f"0.{i}",
+                filename=filename,
+                packagetype="sdist",
+                sha256=f"{i:064x}",
+            )
+            content_artifact = ContentArtifact.objects.create(
+                content=package, relative_path=filename
+            )
+            RemoteArtifact.objects.create(
+                content_artifact=content_artifact,
+                remote=remote,
+                url=f"https://example.com/{filename}",
+                md5=f"{i:032x}",
+            )
+        self.content = PythonPackageContent.objects.filter(name_normalized="shelf-reader")
+
+    def test_one_query(self):
+        """Test that the metadata of a project is built in one query."""
+        with CaptureQueriesContext(connection) as queries:
+            metadata = python_content_to_json("shelf", self.content)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(metadata["info"]["version"], "0.19")
+        self.assertEqual(len(metadata["releases"]), 20)
+        self.assertEqual(metadata["releases"]["0.3"][0]["md5_digest"], f"{3:032x}")
+        self.assertEqual(metadata["urls"][0]["digests"]["md5"], f"{19:032x}")
+
+    def test_version(self):
+        """Test that the metadata of a version is built in one query."""
+        with CaptureQueriesContext(connection) as queries:
+            metadata = python_content_to_json("shelf", self.content, version="0.3")
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(metadata["info"]["version"], "0.3")
+        self.assertEqual([url["filename"] for url in metadata["urls"]], ["shelf-reader-0.3.tar.gz"])
+        self.assertIsNone(python_content_to_json("shelf", self.content, version="1.0"))
+
+    def test_streamed(self):
+        """Test that the streamed metadata is the same as the metadata built in memory."""
+        for version in (None, "0.3"):
+            with self.subTest(version=version):
+                chunks = python_content_to_json_stream("shelf", self.content, version=version)
+                self.assertEqual(
+                    json.loads("".join(chunks)),
+                    json.loads(json.dumps(python_content_to_json("shelf", self.content, version))),
+                )
+        self.assertIsNone(python_content_to_json_stream("shelf", self.content, version="1.0"))
+
+    def test_project_index(self):
+        """Test that the metadata from the project index is the same as from the content."""
+        repository = PythonRepository.objects.create(name="shelf-reader")
+        with repository.new_version() as version:
+            version.add_content(self.content)
+        entry = ProjectIndexEntry.objects.for_version(version).get(name_normalized="shelf-reader")
+        self.assertEqual(entry.latest_version, "0.19")
+        self.assertEqual(entry.file_count, 20)
+        self.assertEqual(
+            project_index_entry_to_json("shelf", entry, last_serial=1),
+            python_content_to_json("shelf", self.content, last_serial=1),
+        )
+
+
+class TestVersionKey(TestCase):
+    """Test the sortable keys of the versions."""
+
+    def test_same_order_as_packaging(self):
+        """Test that the keys sort like the versions they are computed from."""
+        versions = [
+            "0",
+            "0.0.0",
+            "1.0.dev0",
+            "1.0a1.dev2",
+            "1.0a1",
+            "1.0a1.post1",
+            "1.0a10",
+            "1.0b2",
+            "1.0rc1.post2.dev3",
+            "1.0",
+            "1.0.0",
+            "1.0+ab",
+            "1.0+abc",
+            "1.0+abc.def",
+            "1.0+abc.5",
+            "1.0+5",
+            "1.0.post1",
+            "1.9",
+            "1.10",
+            "2.0.post1.dev1",
+            "1!0.1",
+        ]
+        for a in versions:
+            for b in versions:
+                with self.subTest(a=a, b=b):
+                    self.assertEqual(Version(a) < Version(b), version_key(a) < version_key(b))
+                    self.assertEqual(Version(a) == Version(b), version_key(a) == version_key(b))
+
+    def test_invalid_version(self):
+        """Test that the versions that can't be parsed sort first."""
+        self.assertEqual(version_key("not a version"), "")
+        self.assertLess(version_key("not a version"), version_key("0"))
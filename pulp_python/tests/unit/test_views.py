@@ -0,0 +1,247 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from pulp_python.app.models import (
+    PROJECT_INDEX_KEY,
+    SUMMARY_KEY,
+    PackageProvenance,
+    PythonDistribution,
+    PythonPackageContent,
+    PythonRepository,
+)
+from pulp_python.app.pypi.views import (
+    DistributionCache,
+    PyPIMixin,
+    XMLRPCView,
+    distribution_cache,
+)
+
+
+class TestProjectPackages(TestCase):
+    """Test the lookup of the packages of a project by the PyPI APIs."""
+
+    def create_version(self, files):
+        """Create a repository version with a project of the given number of files."""
+        packages = [
+            PythonPackageContent.objects.create(
+                name="shelf-reader",
+                version=f"0.{i}",
+                filename=f"shelf-reader-0.{i}.tar.gz",
+                packagetype="sdist",
+                sha256=f"{files:032x}{i:032x}",
+            )
+            for i in range(files)
+        ]
+        provenances = [
+            PackageProvenance.objects.create(package=package, provenance={"name": package.filename})
+            for package in packages[::2]
+        ]
+        repository = PythonRepository.objects.create(name=f"shelf-reader-{files}")
+        with repository.new_version() as version:
+            version.add_content(
+                PythonPackageContent.objects.filter(pk__in=[p.pk for p in packages])
+            )
+            version.add_content(
+                PackageProvenance.objects.filter(pk__in=[p.pk for p in provenances])
+            )
+        # Lookup the packages from the content instead of the project index
+        del version.info[PROJECT_INDEX_KEY]
+        return version
+
+    def test_one_query(self):
+        """Test that the packages are found in one query whatever the number of files."""
+        for files in (1, 50):
+            version = self.create_version(files)
+            with self.subTest(files=files), CaptureQueriesContext(connection) as queries:
+                packages = PyPIMixin.get_project_packages(version, "shelf-reader")
+                self.assertEqual(len(queries), 1)
+                self.assertEqual(len(packages), files)
+                self.assertEqual(
+                    {p["filename"] for p in packages if p["provenance"]},
+                    {f"shelf-reader-0.{i}.tar.gz" for i in range(0, files, 2)},
+                )
+
+
+class TestSummary(TestCase):
+    """Test the summary statistics of the repository versions."""
+
+    def test_summary(self):
+        """Test that the summary is stored when the repository version is created."""
+        packages = [
+            PythonPackageContent.objects.create(
+                name=name,
+                version=version,
+                filename=f"{name}-{version}{extension}",
+                packagetype="sdist",
+                sha256=f"{i:064x}",
+            )
+            for i, (name, version, extension) in enumerate(
+                (
+                    ("shelf-reader", "0.1", ".tar.gz"),
+                    ("shelf-reader", "0.1", ".zip"),
+                    ("shelf-reader", "0.2", ".tar.gz"),
+                    ("aiohttp", "3.9.0", ".tar.gz"),
+                )
+            )
+        ]
+        repository = PythonRepository.objects.create(name="summary")
+        with repository.new_version() as version:
+            version.add_content(
+                PythonPackageContent.objects.filter(pk__in=[p.pk for p in packages])
+            )
+        version.refresh_from_db()
+        self.assertEqual(version.info[SUMMARY_KEY], {"projects": 2, "releases": 3, "files": 4})
+
+
+class TestXMLRPCParams(TestCase):
+    """Test the validation of the parameters of the XML-RPC calls."""
+
+    def test_valid_params(self):
+        """Test that the parameters must match the types of the method parameters."""
+        for params, types, valid in (
+            ((), (), True),
+            ((1,), (int,), True),
+            ((), (int,), False),
+            ((1, 2), (int,), False),
+            (("1",), (int,), False),
+            ((True,), (int,), False),
+            ((None,), (int,), False),
+        ):
+            with self.subTest(params=params, types=types):
+                self.assertEqual(XMLRPCView.valid_params(params, types), valid)
+
+
+@override_settings(PYTHON_DISTRIBUTION_CACHE_TTL=60)
+class TestDistributionCache(TestCase):
+    """Test the in-process cache of the distributions resolved by the PyPI APIs."""
+
+    def setUp(self):
+        distribution_cache.clear()
+        self.addCleanup(distribution_cache.clear)
+
+    def test_hit(self):
+        """Test that a cached value is returned until it expires, and can't be changed."""
+        cache = DistributionCache()
+        value = {"distribution": "shelf-reader"}
+        cache.set("shelf-reader", value)
+        value["distribution"] = "aiohttp"
+
+        cached = cache.get("shelf-reader")
+        self.assertEqual(cached, {"distribution": "shelf-reader"})
+        with self.assertRaises(TypeError):
+            cached["repository_version"] = None
+        self.assertIsNone(cache.get("aiohttp"))
+
+    def test_expiry(self):
+        """Test that the values expire after PYTHON_DISTRIBUTION_CACHE_TTL seconds."""
+        cache = DistributionCache()
+        with patch("pulp_python.app.pypi.views.monotonic", return_value=1000):
+            cache.set("shelf-reader", {"distribution": "shelf-reader"})
+            # Adding to a cached value doesn't extend its lifetime
+            with patch("pulp_python.app.pypi.views.monotonic", return_value=1030):
+                cache.set("shelf-reader", {"distribution": "shelf-reader", "published": True})
+        with patch("pulp_python.app.pypi.views.monotonic", return_value=1060):
+            self.assertIsNotNone(cache.get("shelf-reader"))
+        with patch("pulp_python.app.pypi.views.monotonic", return_value=1061):
+            self.assertIsNone(cache.get("shelf-reader"))
+        self.assertEqual(cache.entries, {})
+
+    def test_signal_invalidation(self):
+        """Test that the cache is cleared when a distribution or what it serves is saved."""
+        distribution_cache.set("shelf-reader", {"distribution": "shelf-reader"})
+        repository = PythonRepository.objects.create(name="distribution-cache")
+        self.assertIsNone(distribution_cache.get("shelf-reader"))
+
+        distribution_cache.set("shelf-reader", {"distribution": "shelf-reader"})
+        PythonDistribution.objects.create(
+            name="distribution-cache", base_path="distribution-cache", repository=repository
+        )
+        self.assertIsNone(distribution_cache.get("shelf-reader"))
+
+    def test_request_copy(self):
+        """Test that the requests resolve the distribution from the cache in their own copy."""
+        repository = PythonRepository.objects.create(name="distribution-cache")
+        PythonDistribution.objects.create(
+            name="distribution-cache", base_path="distribution-cache", repository=repository
+        )
+
+        def view():
+            mixin = PyPIMixin()
+            mixin.kwargs = {"path": "distribution-cache"}
+            mixin.request = SimpleNamespace(method="GET")
+            return mixin
+
+        latest_version = repository.latest_version()
+        first = view()
+        first.resolve()["unrelated"] = True
+        self.assertEqual(first.get_served_version(), latest_version)
+
+        second = view()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(second.get_served_version(), latest_version)
+        self.assertEqual(len(queries), 0)
+        self.assertNotIn("unrelated", second.resolve())
+
+
+SIMPLE_PAGE_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "simple": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "simple"},
+}
+
+
+@override_settings(CACHES=SIMPLE_PAGE_CACHES, PYTHON_SIMPLE_PAGE_CACHE="simple")
+class TestSimplePageCache(TestCase):
+    """Test the cache of the simple pages rendered by the PyPI API."""
+
+    def setUp(self):
+        self.repository = PythonRepository.objects.create(name="simple-page-cache")
+        PythonDistribution.objects.create(
+            name="simple-page-cache", base_path="simple-page-cache", repository=self.repository
+        )
+        self.add_package("0.1")
+        self.url = f"/{settings.PYPI_PATH_PREFIX.strip('/')}/simple-page-cache/simple/shelf-reader/"
+        self.addCleanup(caches["simple"].clear)
+
+    def add_package(self, version):
+        """Add a release of the project to a new version of the repository."""
+        package = PythonPackageContent.objects.create(
+            name="shelf-reader",
+            version=version,
+            filename=f"shelf-reader-{version}.tar.gz",
+            packagetype="sdist",
+            sha256=version.encode().hex().ljust(64, "0"),
+        )
+        with self.repository.new_version() as version:
+            version.add_content(PythonPackageContent.objects.filter(pk=package.pk))
+
+    def test_cached(self):
+        """Test that the page is served from the cache to the following requests."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("shelf-reader-0.1.tar.gz", response.content.decode())
+        key = f"pulp_python:simple:{response.headers['ETag']}"
+        self.assertIsNotNone(caches["simple"].get(key))
+
+        caches["simple"].set(key, "cached page")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode(), "cached page")
+
+    def test_new_version(self):
+        """Test that the page of a new repository version isn't served from the cache."""
+        etag = self.client.get(self.url).headers["ETag"]
+        caches["simple"].set(f"pulp_python:simple:{etag}", "cached page")
+
+        self.add_package("0.2")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("shelf-reader-0.2.tar.gz", response.content.decode())
+        self.assertNotEqual(response.headers["ETag"], etag)
+        key = f"pulp_python:simple:{response.headers['ETag']}"
+        self.assertEqual(caches["simple"].get(key), response.content.decode())